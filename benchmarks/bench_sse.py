@@ -0,0 +1,64 @@
+"""Tokens/sec benchmark for the SSE decoding path used by the LLM streams.
+
+Run from the repository root:
+    python benchmarks/bench_sse.py [--tokens 50000]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.sse import DONE, SSEDecoder, loads
+
+def build_stream(tokens: int, seed: int = 0) -> list:
+    """Synthetic OpenAI-style stream split into network-sized reads"""
+    rng = random.Random(seed)
+    words = ['Las', ' Vegas', ' SEO', ' local', ' search', ' ranking', ',', '.', ' casino', ' guide']
+    body = bytearray(b': keep-alive\n\n')
+    for i in range(tokens):
+        event = {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion.chunk',
+            'choices': [{'index': 0, 'delta': {'content': words[i % len(words)]}, 'finish_reason': None}]
+        }
+        body += b'data: ' + json.dumps(event).encode() + b'\n\n'
+    body += b'data: [DONE]\n\n'
+
+    chunks, pos = [], 0
+    while pos < len(body):
+        size = rng.randint(64, 4096)
+        chunks.append(bytes(body[pos:pos + size]))
+        pos += size
+    return chunks
+
+def decode_with_sse_decoder(chunks: list) -> int:
+    decoder = SSEDecoder()
+    count = 0
+    for chunk in chunks:
+        for event in decoder.feed(chunk):
+            if event == DONE:
+                return count
+            if loads(event)['choices'][0]['delta'].get('content'):
+                count += 1
+    return count
+
+def run(tokens: int, repeat: int) -> dict:
+    chunks = build_stream(tokens)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decoded = decode_with_sse_decoder(chunks)
+        best = min(best, time.perf_counter() - start)
+    assert decoded == tokens, (decoded, tokens)
+    return {'tokens': tokens, 'seconds': round(best, 4), 'tokens_per_sec': round(tokens / best)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tokens, args.repeat)))
@@ -0,0 +1,107 @@
+"""Regenerate the checked-in benchmark fixtures (deterministic).
+
+Run from the repository root:
+    python benchmarks/make_fixtures.py
+
+Only needed when the fixture shapes change; regenerate the baseline
+afterwards with `python benchmarks/run.py --save-baseline`.
+"""
+import json
+import random
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+# Pages: (name, article paragraphs, sidebar links, inline script KB)
+HTML_SIZES = (('small', 6, 10, 1), ('medium', 60, 60, 12), ('large', 300, 200, 60))
+TEXT_SIZES = (('small', 300), ('medium', 2000), ('large', 10000))
+
+SUBJECTS = [
+    'Local search in Las Vegas', 'A well-structured landing page', 'Our SEO audit', 'Google Business Profile',
+    'Mobile page speed', 'The Strip hospitality market', 'Schema markup', 'A content calendar',
+    'Internal linking', 'Review velocity', 'Henderson and Summerlin searches', 'Core Web Vitals',
+]
+VERBS = [
+    'improves', 'influences', 'drives', 'shapes', 'undermines', 'supports', 'accelerates', 'complicates',
+]
+OBJECTS = [
+    'organic rankings for competitive keywords', 'click-through rates from the results page',
+    'conversions from visitors on their phones', 'how casinos and hotels compete for attention',
+    'the visibility of restaurants off the Strip', 'crawl efficiency on large sites',
+    "a business's reputation in the local pack", 'engagement with long-form guides',
+]
+TAILS = [
+    '', ' during convention season', ' for small businesses', ' according to recent data',
+    ' in 2024', ' when measured over several months', ', which matters more than most owners expect',
+]
+QUERY_TEMPLATES = [
+    'What are the latest SEO trends in {place}?', 'How do I optimize my meta tags?',
+    'Show me examples of successful {place} businesses', 'What are the statistics for keyword rankings?',
+    'Tell me about competitor websites in {place}', 'Compare local SEO with paid search',
+    'How does my competitor rank for {topic}?', 'Write a title tag for a {topic} page',
+    'What is the best way to get reviews?', 'Explain {topic} in simple terms',
+    'What are the top {topic} agencies in {place} for 2024?', 'Give me a checklist for {topic}',
+]
+PLACES = ['Las Vegas', 'Henderson', 'Summerlin', 'North Las Vegas', 'Boulder City']
+TOPICS = ['schema markup', 'link building', 'page speed', 'local citations', 'content marketing', 'technical SEO']
+
+def sentence(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(TAILS)}."
+
+def paragraph(rng: random.Random) -> str:
+    return ' '.join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+def build_html(rng: random.Random, paragraphs: int, links: int, script_kb: int) -> str:
+    nav = ''.join(f'<li><a href="/page-{i}">Section {i}</a></li>' for i in range(12))
+    sidebar = ''.join(f'<li><a href="/post-{i}">{rng.choice(SUBJECTS)}</a></li>' for i in range(links))
+    script = 'var data = [' + ','.join(str(rng.randint(0, 999)) for _ in range(script_kb * 256)) + '];'
+    body = []
+    for i in range(paragraphs):
+        if i % 8 == 0:
+            body.append(f'<h2 class="section-title">{rng.choice(SUBJECTS)}</h2>')
+        if i % 11 == 5:
+            items = ''.join(f'<li>{sentence(rng)}</li>' for _ in range(4))
+            body.append(f'<ul class="checklist">{items}</ul>')
+        text = paragraph(rng).replace('Las Vegas', '<a href="/las-vegas">Las Vegas</a>', 1)
+        body.append(f'<p>{text}</p>')
+        if i % 15 == 7:
+            body.append('<div class="ad-slot"><p>Sponsored: book your stay today and save.</p></div>')
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<title>Las Vegas SEO Guide: Ranking Locally in a Competitive Market</title>'
+        '<meta name="description" content="A practical guide to local search for Las Vegas businesses, '
+        'covering reviews, schema, speed and content that ranks.">'
+        f'<style>body {{ font-family: sans-serif; }} .nav li {{ display: inline; }}</style>'
+        f'<script>{script}</script></head><body>'
+        f'<header class="site-header"><nav class="nav"><ul>{nav}</ul></nav></header>'
+        '<div class="cookie-banner">We use cookies to improve your experience.</div>'
+        '<div class="layout"><div class="main-column">'
+        '<article class="post"><h1>Las Vegas SEO Guide</h1>' + ''.join(body) + '</article>'
+        '</div><aside class="sidebar"><h3>Related posts</h3><ul>' + sidebar + '</ul></aside></div>'
+        '<footer class="site-footer"><p>Copyright Vegas SEO Guru. All rights reserved.</p></footer>'
+        '</body></html>'
+    )
+
+def build_text(rng: random.Random, words: int) -> str:
+    paragraphs, count = [], 0
+    while count < words:
+        text = paragraph(rng)
+        paragraphs.append(text)
+        count += len(text.split())
+    return '\n\n'.join(paragraphs)
+
+def main() -> None:
+    rng = random.Random(2024)
+    FIXTURES.mkdir(exist_ok=True)
+    for name, paragraphs, links, script_kb in HTML_SIZES:
+        (FIXTURES / f'page_{name}.html').write_text(build_html(rng, paragraphs, links, script_kb), encoding='utf-8')
+    for name, words in TEXT_SIZES:
+        (FIXTURES / f'article_{name}.txt').write_text(build_text(rng, words), encoding='utf-8')
+    queries = [
+        template.format(place=rng.choice(PLACES), topic=rng.choice(TOPICS))
+        for template in QUERY_TEMPLATES for _ in range(5)
+    ]
+    (FIXTURES / 'queries.json').write_text(json.dumps(queries, indent=2) + '\n', encoding='utf-8')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""The original (pre-optimization) implementations of the benchmarked hot paths.
+
+They are read from git at REFERENCE_REV instead of being copied into the
+tree, and timed in the same run as the current code: a ratio between two
+implementations measured seconds apart survives noisy or different machines,
+where a stored absolute baseline does not.
+"""
+import subprocess
+import sys
+import types
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The commit before the hot paths were rewritten
+REFERENCE_REV = 'af2e7eb'
+
+def load_module(rev: str, path: str) -> types.ModuleType:
+    """Import `path` as it was at `rev`; raises RuntimeError when git or the revision is unavailable"""
+    try:
+        source = subprocess.run(
+            ['git', 'show', f'{rev}:{path}'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError(f"cannot read {path} at {rev}: {e}")
+    name = f'reference_{rev}_' + path.replace('/', '_').removesuffix('.py')
+    module = types.ModuleType(name)
+    module.__file__ = f'{rev}:{path}'
+    sys.modules[name] = module
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+def build_reference_cases(
+    rev: str,
+    run: Callable[[object], object],
+    pages: Dict[str, str],
+    articles: Dict[str, str],
+    keywords: list,
+    queries: list
+) -> Dict[str, Callable[[], object]]:
+    """Reference cases named like their counterparts in run.build_cases; `run` drives a coroutine"""
+    from bs4 import BeautifulSoup
+
+    scraper_module = load_module(rev, 'src/services/content_scraper.py')
+    analyzer_module = load_module(rev, 'src/services/agents/content_analyzer.py')
+    query_module = load_module(rev, 'src/services/query_analyzer.py')
+
+    scraper = scraper_module.ContentScraper()
+    agent = analyzer_module.ContentAnalysisAgent(
+        config=analyzer_module.ContentAnalysisConfig(important_keywords=keywords)
+    )
+    analyzer = query_module.QueryAnalyzer()
+
+    cases: Dict[str, Callable[[], object]] = {}
+    for size, html in pages.items():
+        # The old scraper parsed with BeautifulSoup before extracting; the new one parses itself
+        cases[f'ContentScraper._extract_main_content[{size}]'] = (
+            lambda html=html: scraper._extract_main_content(BeautifulSoup(html, 'html.parser'))
+        )
+        cases[f'ContentAnalysisAgent.analyze_content[{size}]'] = (
+            lambda text=articles[size], html=html: run(agent.analyze_content(text, html))
+        )
+    cases['QueryAnalyzer.analyze[60 queries]'] = lambda: [analyzer.analyze(query) for query in queries]
+    # The old analyzer had no cache, so cached and uncached runs compare against the same code
+    cases['QueryAnalyzer.analyze[60 queries, uncached]'] = cases['QueryAnalyzer.analyze[60 queries]']
+    return cases
@@ -0,0 +1,290 @@
+"""Offline micro-benchmarks for the CPU hot paths, with baseline comparison.
+
+Run from the repository root:
+    python benchmarks/run.py                   # compare against baseline.json
+    python benchmarks/run.py --save-baseline   # record a new baseline
+    python benchmarks/run.py -k extract        # only cases whose name contains "extract"
+
+Each case reports the best per-call time over several repeats. Cases that
+have an original implementation (see reference.py) are also timed against
+it in the same run, and judged on that speedup: a case is flagged when its
+speedup fell more than --threshold (default 25%) below the recorded one.
+Machine speed largely cancels out, so this holds on any machine.
+Cases without a reference are judged on absolute time, only when the
+baseline was recorded in the same environment (Python, machine, CPU count,
+HTML parser backend). Any flagged case makes the run exit with status 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bench_sse import build_stream, decode_with_sse_decoder
+from reference import REFERENCE_REV, build_reference_cases
+from src.services.agents.content_analyzer import ContentAnalysisAgent, ContentAnalysisConfig
+from src.services.content_scraper import ContentScraper
+from src.services.context_builder import pack_context
+from src.services.html_text import extract_text_from_response
+from src.services.main_content import _parser_backend
+from src.services.query_analyzer import QueryAnalyzer
+from src.services.sse import iter_sse_json
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+BASELINE = Path(__file__).parent / 'baseline.json'
+SIZES = ('small', 'medium', 'large')
+KEYWORDS = ['Las Vegas SEO', 'local SEO', 'Las Vegas', 'SEO services', 'Nevada']
+
+class ChunkReplay:
+    """Async iterator over pre-split chunks (a plain class, so abandoning it early needs no cleanup)"""
+
+    def __init__(self, chunks: List[bytes]):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeContent:
+    """Stands in for aiohttp's StreamReader: replays a body in network-sized reads"""
+
+    def __init__(self, chunks: List[bytes]):
+        self._chunks = chunks
+
+    def iter_chunked(self, size: int) -> ChunkReplay:
+        return ChunkReplay(self._chunks)
+
+    def iter_any(self) -> ChunkReplay:
+        return ChunkReplay(self._chunks)
+
+class FakeResponse:
+    charset = 'utf-8'
+
+    def __init__(self, body: bytes, chunk_size: int = 16384):
+        self.content = FakeContent([body[i:i + chunk_size] for i in range(0, len(body), chunk_size)])
+
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+def build_cases(loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[], object]]:
+    scraper = ContentScraper()
+    agent = ContentAnalysisAgent(config=ContentAnalysisConfig(important_keywords=KEYWORDS))
+    analyzer = QueryAnalyzer()
+    queries = json.loads(fixture('queries.json'))
+    cases: Dict[str, Callable[[], object]] = {}
+
+    for size in SIZES:
+        html = fixture(f'page_{size}.html')
+        body = html.encode('utf-8')
+        text = fixture(f'article_{size}.txt')
+
+        # The CPU side of scrape_page_content: stream the body through the text extractor
+        cases[f'scrape_page_content.extract[{size}]'] = (
+            lambda body=body: loop.run_until_complete(extract_text_from_response(FakeResponse(body), limit=5000))
+        )
+        cases[f'ContentScraper._extract_main_content[{size}]'] = (
+            lambda html=html: scraper._extract_main_content(html)
+        )
+        cases[f'ContentAnalysisAgent.analyze_content[{size}]'] = (
+            lambda text=text, html=html: loop.run_until_complete(agent.analyze_content(text, html))
+        )
+
+    # Five scraped sources of 5000 characters each, as enhance_prompt_with_search sees them
+    article = fixture('article_large.txt')
+    sources = [
+        SimpleNamespace(title=f'Source {i}', content=article[i * 5000:(i + 1) * 5000], snippet=None)
+        for i in range(5)
+    ]
+    cases['context_builder.pack_context[5 sources]'] = lambda: pack_context(queries[0], sources, 600)
+
+    cases['QueryAnalyzer.analyze[60 queries]'] = lambda: [analyzer.analyze(query) for query in queries]
+    # A fresh analyzer per run, so every query misses the LRU
+    cases['QueryAnalyzer.analyze[60 queries, uncached]'] = lambda: QueryAnalyzer().analyze_many(queries)
+
+    stream = build_stream(5000)
+    cases['sse.SSEDecoder[5000 tokens]'] = lambda: decode_with_sse_decoder(stream)
+
+    async def drain_sse_json() -> int:
+        response = FakeResponse(b'')
+        response.content = FakeContent(stream)
+        return sum([1 async for _ in iter_sse_json(response)])
+
+    cases['sse.iter_sse_json[5000 tokens]'] = lambda: loop.run_until_complete(drain_sse_json())
+    return cases
+
+def calibrate(fn: Callable[[], object], min_time: float) -> Tuple[int, float]:
+    """Loops per sample so a sample takes at least `min_time`, and that first sample's seconds per call"""
+    fn()  # warm up caches and lazy imports
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return loops, elapsed / loops
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+def sample(fn: Callable[[], object], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return (time.perf_counter() - start) / loops
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Best seconds per call over `repeat` samples"""
+    loops, best = calibrate(fn, min_time)
+    for _ in range(repeat - 1):
+        best = min(best, sample(fn, loops))
+    return best
+
+def measure_pair(fn: Callable[[], object], reference: Callable[[], object], repeat: int, min_time: float) -> Tuple[float, float]:
+    """Best seconds per call of both, with samples interleaved so slow spells hit both alike"""
+    loops, best = calibrate(fn, min_time)
+    reference_loops, reference_best = calibrate(reference, min_time)
+    for _ in range(repeat - 1):
+        best = min(best, sample(fn, loops))
+        reference_best = min(reference_best, sample(reference, reference_loops))
+    return best, reference_best
+
+def environment() -> Dict[str, object]:
+    """What a timing depends on besides the code"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'html_parser': _parser_backend(None),
+    }
+
+def load_baseline() -> Dict[str, Any]:
+    if not BASELINE.exists():
+        return {'environment': {}, 'results': {}, 'speedups': {}}
+    data = json.loads(BASELINE.read_text())
+    return {
+        'environment': data.get('environment', {}),
+        'results': data.get('results', {}),
+        'speedups': data.get('speedups', {}),
+    }
+
+def save_baseline(results: Dict[str, float], speedups: Dict[str, float]) -> None:
+    BASELINE.write_text(json.dumps({
+        'environment': environment(),
+        'reference': REFERENCE_REV,
+        'recorded_at': time.strftime('%Y-%m-%d'),
+        'results': results,
+        'speedups': speedups,
+    }, indent=2, sort_keys=True) + '\n')
+
+def compare(
+    results: Dict[str, float],
+    speedups: Dict[str, float],
+    baseline: Dict[str, Any],
+    threshold: float,
+    same_environment: bool
+) -> List[Tuple[str, str]]:
+    """Print every case; cases with a reference are judged on their speedup, the rest on absolute time"""
+    regressions = []
+    width = max(len(name) for name in results)
+    print(f"{'case':<{width}}  {'time':>10}  {'baseline':>10}  {'speedup':>8}  {'recorded':>8}  change")
+    for name, seconds in results.items():
+        base = baseline['results'].get(name)
+        base_text = f"{base * 1000:.3f}ms" if base else '-'
+        speedup, recorded = speedups.get(name), baseline['speedups'].get(name)
+        speedup_text = f"{speedup:.2f}x" if speedup else '-'
+        recorded_text = f"{recorded:.2f}x" if recorded else '-'
+
+        if speedup and recorded:
+            # Both timed in this run against the same old code: machine speed cancels out
+            ratio = recorded / speedup
+            judged = True
+        elif base:
+            ratio = seconds / base
+            judged = same_environment
+        else:
+            ratio, judged = None, False
+
+        if ratio is None:
+            change = 'new'
+        else:
+            change = f"{(ratio - 1) * 100:+.1f}%"
+            if ratio > 1 + threshold and judged:
+                change += '  REGRESSION'
+                regressions.append((name, change))
+        print(f"{name:<{width}}  {seconds * 1000:>8.3f}ms  {base_text:>10}  {speedup_text:>8}  {recorded_text:>8}  {change}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='', help='only run cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help='seconds per sample')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before flagging')
+    parser.add_argument('--no-reference', action='store_true', help=f'skip timing the {REFERENCE_REV} implementations')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    try:
+        cases = {name: fn for name, fn in build_cases(loop).items() if args.pattern in name}
+        references: Dict[str, Callable[[], object]] = {}
+        if not args.no_reference:
+            try:
+                references = build_reference_cases(
+                    REFERENCE_REV,
+                    loop.run_until_complete,
+                    {size: fixture(f'page_{size}.html') for size in SIZES},
+                    {size: fixture(f'article_{size}.txt') for size in SIZES},
+                    KEYWORDS,
+                    json.loads(fixture('queries.json'))
+                )
+            except (RuntimeError, ImportError) as e:
+                print(f"Reference implementations unavailable ({e}); comparing absolute times only\n")
+
+        results: Dict[str, float] = {}
+        speedups: Dict[str, float] = {}
+        for name, fn in cases.items():
+            if name in references:
+                results[name], reference = measure_pair(fn, references[name], args.repeat, args.min_time)
+                speedups[name] = reference / results[name]
+            else:
+                results[name] = measure(fn, args.repeat, args.min_time)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    baseline = load_baseline()
+    same_environment = baseline['environment'] == environment()
+    if args.save_baseline:
+        # Absolute timings from another environment are not comparable: start over
+        previous = baseline['results'] if same_environment else {}
+        save_baseline({**previous, **results}, {**baseline['speedups'], **speedups})
+        print(f"Saved {len(results)} baseline(s) to {BASELINE}")
+        return 0
+
+    regressions = compare(results, speedups, baseline, args.threshold, same_environment)
+    if not same_environment:
+        print("\nBaseline was recorded in a different environment; absolute times are reported, not judged:")
+        for key, value in environment().items():
+            if baseline['environment'].get(key) != value:
+                print(f"  {key}: baseline {baseline['environment'].get(key)}, now {value}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -200,6 +200,9 @@ function ChatInterface({ onClose, onAskStart, isExpanded }: ChatInterfaceProps)
         if (chunk.sources) {
           sources = chunk.sources;
         }
+        if (chunk.timing) {
+          console.debug('Response timing', chunk.timing);
+        }
       }
 
       let finalContent = fullResponse.split(/\n*## Sources/)[0].trim();
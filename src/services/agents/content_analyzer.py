@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import re
-from textblob import TextBlob
+from .text_metrics import compute_text_metrics, count_syllables, readability_many
 
 class ContentMetrics(BaseModel):
     word_count: int
@@ -29,51 +29,19 @@ class ContentAnalysisAgent(BaseModel):
         """Calculate Flesch Reading Ease score"""
         if not text:
             return 0.0
-            
-        sentences = len(re.split(r'[.!?]+', text))
-        words = len(text.split())
-        syllables = sum([self._count_syllables(word) for word in text.split()])
-        
-        if sentences == 0 or words == 0:
-            return 0.0
-            
-        return 206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words)
+        return compute_text_metrics(text).readability
+
+    def calculate_readability_many(self, texts: List[str]) -> List[float]:
+        """Flesch Reading Ease for many documents at once"""
+        return readability_many(texts)
 
     def _count_syllables(self, word: str) -> int:
         """Count syllables in a word"""
-        word = word.lower()
-        count = 0
-        vowels = "aeiouy"
-        on_vowel = False
-        
-        for char in word:
-            is_vowel = char in vowels
-            if is_vowel and not on_vowel:
-                count += 1
-            on_vowel = is_vowel
-            
-        if word.endswith('e'):
-            count -= 1
-        if count == 0:
-            count = 1
-        return count
+        return count_syllables(word.lower())
 
     def analyze_keyword_density(self, text: str, keywords: List[str]) -> Dict[str, float]:
-        """Calculate keyword density for given keywords"""
-        text_lower = text.lower()
-        word_count = len(text.split())
-        
-        if word_count == 0:
-            return {keyword: 0.0 for keyword in keywords}
-            
-        densities = {}
-        for keyword in keywords:
-            keyword_lower = keyword.lower()
-            occurrences = text_lower.count(keyword_lower)
-            density = (occurrences * len(keyword.split())) / word_count * 100
-            densities[keyword] = round(density, 2)
-            
-        return densities
+        """Calculate keyword density for given keywords (whole-word matches only)"""
+        return compute_text_metrics(text, keywords).keyword_density(keywords)
 
     def analyze_heading_structure(self, html_content: str) -> Dict[str, int]:
         """Analyze HTML heading structure (h1-h6)"""
@@ -86,11 +54,21 @@ class ContentAnalysisAgent(BaseModel):
 
     async def analyze_content(self, content: str, html_content: Optional[str] = None) -> ContentMetrics:
         """Main method to analyze content quality"""
+        return self.analyze(content, html_content)
+
+    def analyze(self, content: str, html_content: Optional[str] = None) -> ContentMetrics:
+        """Synchronous analysis, safe to run in a worker thread or process"""
+        # TextBlob pulls in NLTK; load it only when content is actually analyzed
+        from textblob import TextBlob
+
+        # Word, sentence, syllable and keyword counts all come from one pass
+        text_metrics = compute_text_metrics(content, self.config.important_keywords)
+
         # Initialize metrics
         metrics = {
-            "word_count": len(content.split()),
-            "keyword_density": self.analyze_keyword_density(content, self.config.important_keywords),
-            "readability_score": self.calculate_readability(content),
+            "word_count": text_metrics.word_count,
+            "keyword_density": text_metrics.keyword_density(self.config.important_keywords),
+            "readability_score": text_metrics.readability,
             "sentiment_score": TextBlob(content).sentiment.polarity,
             "heading_structure": self.analyze_heading_structure(html_content) if html_content else {},
             "meta_description_length": None,
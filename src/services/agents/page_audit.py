@@ -0,0 +1,51 @@
+from typing import List
+import time
+from bs4 import BeautifulSoup
+from .content_analyzer import ContentAnalysisAgent, ContentAnalysisConfig
+
+def audit_html(url: str, html_content: str, keywords: List[str]) -> dict:
+    """Parse a fetched page and run the content analysis agent over it.
+
+    Pure CPU work with picklable arguments and result, so it can run in a
+    worker process.
+    """
+    started = time.perf_counter()
+
+    # Parse HTML and extract text content
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+        
+    # Get text content
+    text_content = soup.get_text()
+    
+    # Clean up text (remove extra whitespace)
+    text_content = " ".join(text_content.split())
+    parsed = time.perf_counter()
+
+    # Initialize the content analysis agent with page-specific focus
+    agent = ContentAnalysisAgent(
+        config=ContentAnalysisConfig(
+            important_keywords=keywords,
+            min_word_count=300,
+            max_keyword_density=2.5,
+            target_readability_score=60.0
+        )
+    )
+
+    # Analyze the content
+    metrics = agent.analyze(text_content, html_content)
+    analyzed = time.perf_counter()
+    report = f"""Page Audit: {url}
+
+{agent.generate_report(metrics)}"""
+
+    # Stage durations (seconds), measured here because this runs in a worker process
+    timings = {
+        "parse": parsed - started,
+        "analyze": analyzed - parsed,
+        "report": time.perf_counter() - analyzed
+    }
+    return {"status": "success", "report": report, "metrics": metrics.model_dump(), "timings": timings}
@@ -0,0 +1,201 @@
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pydantic import BaseModel
+from typing import Dict, Iterable, List
+import os
+import re
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; batch scoring falls back to plain Python
+    np = None
+
+# A word (letters/digits, optionally joined by apostrophes or hyphens) or a
+# run of sentence-ending punctuation
+_TOKEN = re.compile(r"[^\W_]+(?:['’\-][^\W_]+)*|[.!?]+")
+_WORD = re.compile(r"[^\W_]+")
+_WORD_TOKEN = re.compile(r"[^\W_]+(?:['’\-][^\W_]+)*")
+# A sentence is any stretch between sentence-ending punctuation that holds a word
+_SENTENCE = re.compile(r"[^\W_][^.!?]*")
+_JOINERS = re.compile(r"['’\-]")
+_SENTENCE_END = frozenset('.!?')
+_END = object()
+
+VOWELS = frozenset('aeiouy')
+
+# English vocabulary repeats heavily across pages, so word-level counts are memoized
+SYLLABLE_CACHE_SIZE = int(os.getenv('SYLLABLE_CACHE_SIZE', '65536'))
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def count_syllables(word: str) -> int:
+    """Count syllables in a lowercase word"""
+    count = 0
+    on_vowel = False
+
+    for char in word:
+        is_vowel = char in VOWELS
+        if is_vowel and not on_vowel:
+            count += 1
+        on_vowel = is_vowel
+
+    if word.endswith('e'):
+        count -= 1
+    if count == 0:
+        count = 1
+    return count
+
+def flesch_reading_ease(word_count: int, sentence_count: int, syllable_count: int) -> float:
+    if sentence_count == 0 or word_count == 0:
+        return 0.0
+    return 206.835 - 1.015 * (word_count / sentence_count) - 84.6 * (syllable_count / word_count)
+
+class TextMetrics(BaseModel):
+    word_count: int
+    sentence_count: int
+    syllable_count: int
+    keyword_hits: Dict[str, int]
+
+    @property
+    def readability(self) -> float:
+        """Flesch Reading Ease score"""
+        return flesch_reading_ease(self.word_count, self.sentence_count, self.syllable_count)
+
+    def keyword_density(self, keywords: Iterable[str]) -> Dict[str, float]:
+        """Percentage of words taken up by each keyword (phrases count every word)"""
+        if self.word_count == 0:
+            return {keyword: 0.0 for keyword in keywords}
+        return {
+            keyword: round(self.keyword_hits.get(keyword, 0) * len(keyword.split()) / self.word_count * 100, 2)
+            for keyword in keywords
+        }
+
+class KeywordMatcher:
+    """Word-level trie over keyword phrases.
+
+    Matching walks the text's words once, advancing every partial phrase in
+    parallel, so all keywords are counted in a single pass and only whole
+    words match ("NV" does not match inside "environment").
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.root: Dict = {}
+        for keyword in keywords:
+            words = _WORD.findall(keyword.lower())
+            if not words:
+                continue
+            node = self.root
+            for word in words:
+                node = node.setdefault(word, {})
+            node.setdefault(_END, []).append(keyword)
+
+    def advance(self, active: List[Dict], word: str, hits: Dict[str, int]) -> List[Dict]:
+        """Feed one word; returns the partial phrases still open after it"""
+        if not active and word not in self.root:
+            return active
+        next_active = []
+        for node in active + [self.root]:
+            child = node.get(word)
+            if child is None:
+                continue
+            matched = child.get(_END)
+            if matched:
+                for keyword in matched:
+                    hits[keyword] += 1
+                if len(child) > 1:
+                    next_active.append(child)
+            else:
+                next_active.append(child)
+        return next_active
+
+def compute_text_metrics(text: str, keywords: Iterable[str] = ()) -> TextMetrics:
+    """Word, sentence, syllable and keyword counts from one tokenizer pass"""
+    keywords = list(keywords)
+    matcher = KeywordMatcher(keywords) if keywords else None
+    hits = {keyword: 0 for keyword in keywords}
+    active: List[Dict] = []
+
+    word_count = 0
+    sentence_count = 0
+    syllable_count = 0
+    open_sentence = False
+
+    for token in _TOKEN.findall(text.lower()):
+        if token[0] in _SENTENCE_END:
+            if open_sentence:
+                sentence_count += 1
+                open_sentence = False
+            active = []
+            continue
+
+        word_count += 1
+        open_sentence = True
+        syllable_count += count_syllables(token)
+
+        if matcher is not None:
+            if token.isalnum():
+                active = matcher.advance(active, token, hits)
+            else:
+                # "vegas-based", "vegas's": match the parts as separate words
+                for part in _JOINERS.split(token):
+                    active = matcher.advance(active, part, hits)
+
+    if open_sentence:
+        sentence_count += 1
+
+    return TextMetrics(
+        word_count=word_count,
+        sentence_count=sentence_count,
+        syllable_count=syllable_count,
+        keyword_hits=hits
+    )
+
+def readability_many(texts: Iterable[str]) -> List[float]:
+    """Flesch Reading Ease for a batch of documents.
+
+    Each document is reduced to distinct-word counts by the regex engine and
+    every distinct word in the batch is syllable-counted once; per-document
+    totals and the scores are then computed over arrays (with numpy when it
+    is installed) instead of word by word.
+    """
+    vocabulary: Dict[str, int] = {}
+    word_ids = array('q')
+    word_weights = array('q')
+    offsets = array('q', [0])
+    word_counts = array('q')
+    sentence_counts = array('q')
+
+    for text in texts:
+        lowered = text.lower()
+        counts = Counter(_WORD_TOKEN.findall(lowered))
+        for word, count in counts.items():
+            word_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+            word_weights.append(count)
+        offsets.append(len(word_ids))
+        word_counts.append(sum(counts.values()))
+        sentence_counts.append(len(_SENTENCE.findall(lowered)))
+
+    # Dict order is insertion order, so position i holds the syllables of word id i
+    syllables = array('q', map(count_syllables, vocabulary))
+
+    if np is None:
+        scores = []
+        for index, word_count in enumerate(word_counts):
+            start, end = offsets[index], offsets[index + 1]
+            syllable_count = sum(syllables[word_ids[i]] * word_weights[i] for i in range(start, end))
+            scores.append(flesch_reading_ease(word_count, sentence_counts[index], syllable_count))
+        return scores
+
+    bounds = np.frombuffer(offsets, dtype=np.int64)
+    words = np.frombuffer(word_counts, dtype=np.int64).astype(np.float64)
+    sentences = np.frombuffer(sentence_counts, dtype=np.int64).astype(np.float64)
+    per_entry = np.frombuffer(syllables, dtype=np.int64)[np.frombuffer(word_ids, dtype=np.int64)]
+    per_entry *= np.frombuffer(word_weights, dtype=np.int64)
+    running = np.concatenate(([0], np.cumsum(per_entry)))
+    syllable_counts = (running[bounds[1:]] - running[bounds[:-1]]).astype(np.float64)
+
+    scored = (words > 0) & (sentences > 0)
+    safe_words = np.where(scored, words, 1.0)
+    safe_sentences = np.where(scored, sentences, 1.0)
+    scores = 206.835 - 1.015 * (safe_words / safe_sentences) - 84.6 * (syllable_counts / safe_words)
+    return np.where(scored, scores, 0.0).tolist()
@@ -9,9 +9,25 @@ export interface Source {
   content?: string;
 }
 
+export interface TimingSpan {
+  name: string;
+  start_ms: number;
+  duration_ms: number;
+  attributes: Record<string, unknown>;
+}
+
+export interface RequestTiming {
+  trace_id: string;
+  name: string;
+  total_ms: number;
+  spans: TimingSpan[];
+}
+
 export interface StreamChunk {
   content?: string;
   sources?: Source[];
+  provider?: ModelType;
+  timing?: RequestTiming;
   error?: string;
 }
 
@@ -1,27 +1,69 @@
 import asyncio
+import functools
+import hashlib
 import json
 import os
 import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Optional, AsyncGenerator
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+from typing import Awaitable, Callable, List, Optional, AsyncGenerator
+
+try:
+    from defusedxml import ElementTree as SafeElementTree
+except ImportError:  # defusedxml is optional; parse_sitemap screens DTDs itself without it
+    SafeElementTree = None
 
 from fastapi import FastAPI, HTTPException, Response, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import aiohttp
-from bs4 import BeautifulSoup
 from fastapi.middleware.cors import CORSMiddleware
 
 # Add the src directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.character import SYSTEM_MESSAGE
-from .agents.content_analyzer import ContentAnalysisAgent, ContentAnalysisConfig
+from .http_client import http_client
+from .html_text import extract_text_from_response
+from .cache import AsyncTTLCache, normalize_query
+from .page_store import canonical_url, page_store
+from .sse import iter_sse_json
+from .provider_router import ProviderRouter
+from .cpu_pool import cpu_pool, CpuPoolBusy
+from .metrics import MetricsMiddleware, RATE_BUCKETS, registry
+from .tracing import flush_exports, record_span, span, start_trace
+from .rate_limit import RateLimitExceeded, brave_limiter, close_store, host_key, scrape_limiter
+from .resilience import CircuitOpenError, upstreams
+from .context_builder import chars_per_token, context_budget, pack_context
+from .search_index import search_index
+from .history import HistoryManager
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled session for every outbound call, closed on shutdown
+    log_provider_config()
+    await http_client.start()
+    cpu_pool.start()
+    # Pick up blog posts published while the server was down
+    await asyncio.to_thread(search_index.sync_blog)
+    try:
+        yield
+    finally:
+        await http_client.close()
+        await flush_exports()
+        page_store.close()
+        search_index.close()
+        cpu_pool.shutdown()
+        close_store()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -30,12 +72,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
 
-# Debug logging for environment variables
-print("Environment variables:")
-print(f"GEMINI_API_KEY present: {'VITE_GEMINI_API_KEY' in os.environ}")
-print(f"GEMINI_API_KEY value: {os.getenv('VITE_GEMINI_API_KEY')[:10]}...")
+# Upstream and pipeline metrics, exposed at /metrics
+LLM_TTFT = registry.histogram('llm_time_to_first_token_seconds', 'Time from request to first streamed chunk', ['provider'])
+LLM_DURATION = registry.histogram('llm_stream_duration_seconds', 'Time from request to end of stream', ['provider', 'outcome'])
+LLM_TOKENS_PER_SECOND = registry.histogram('llm_tokens_per_second', 'Streamed chunks (about one token each) per second after the first', ['provider'], RATE_BUCKETS)
+LLM_ERRORS = registry.counter('llm_errors_total', 'LLM streams that failed', ['provider'])
+BRAVE_DURATION = registry.histogram('brave_request_duration_seconds', 'Brave Search API round trip', ['status'])
+BRAVE_ERRORS = registry.counter('brave_errors_total', 'Failed Brave Search attempts', ['reason'])
+SEARCH_ANSWERS = registry.counter('search_answers_total', 'Search-augmented prompts by where their sources came from', ['source'])
+HISTORY_TOKENS = registry.counter('chat_history_tokens_total', 'Estimated conversation history tokens sent to LLMs (sent) and compacted away (saved)', ['kind'])
+CONTEXT_TOKENS = registry.counter('search_context_tokens_total', 'Estimated search context tokens sent to LLMs (packed) and trimmed away (saved)', ['kind'])
+AUDIT_STAGE_DURATION = registry.histogram('audit_stage_duration_seconds', 'Page audit time per stage', ['stage'])
 
 DEEPSEEK_API_KEY = os.getenv('VITE_DEEPSEEK_API_KEY')
 OPENAI_API_KEY = os.getenv('VITE_OPENAI_API_KEY')
@@ -49,6 +100,65 @@ API_URLS = {
     'brave': 'https://api.search.brave.com/res/v1/web/search'
 }
 
+# Providers served by stream_openai_compatible: display name and model id
+OPENAI_COMPATIBLE_MODELS = {
+    'deepseek': ('DeepSeek', 'deepseek-chat'),
+    'openai': ('OpenAI', 'gpt-4'),
+}
+
+# Search-phase latency bounds: scrapes run concurrently, each URL gets its own
+# deadline, and the whole search (Brave call + scrapes) has an overall budget
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', '5'))
+SCRAPE_URL_TIMEOUT = float(os.getenv('SCRAPE_URL_TIMEOUT', '4.0'))
+SEARCH_BUDGET = float(os.getenv('SEARCH_BUDGET', '6.0'))
+
+# Fallback query hedging: 'off' tries the variants strictly in sequence,
+# 'delayed' starts the next variant if Brave has not answered the current one
+# after SEARCH_HEDGE_DELAY seconds, 'parallel' starts every variant at once.
+# Only the Brave calls are hedged; the winner alone is scraped, and losing
+# calls finish into hedge_results. Speculative launches are capped at
+# SEARCH_HEDGE_MAX_PER_MINUTE per process.
+SEARCH_HEDGE_MODES = ('off', 'delayed', 'parallel')
+SEARCH_HEDGE_MODE = os.getenv('SEARCH_HEDGE_MODE', 'delayed')
+if SEARCH_HEDGE_MODE not in SEARCH_HEDGE_MODES:
+    raise RuntimeError(f"SEARCH_HEDGE_MODE={SEARCH_HEDGE_MODE!r} is not one of {', '.join(SEARCH_HEDGE_MODES)}")
+SEARCH_HEDGE_DELAY = float(os.getenv('SEARCH_HEDGE_DELAY', '1.5'))
+SEARCH_HEDGE_MAX_PER_MINUTE = int(os.getenv('SEARCH_HEDGE_MAX_PER_MINUTE', '30'))
+_hedge_launches: deque = deque()
+_hedge_losers: set = set()
+
+# Finished answers keyed by model, normalized history and search context, so
+# repeated first-turn questions are replayed without calling the LLM
+completion_cache = AsyncTTLCache(
+    maxsize=int(os.getenv('COMPLETION_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('COMPLETION_CACHE_TTL', '900')),
+    max_bytes=int(os.getenv('COMPLETION_CACHE_MAX_BYTES', str(8 * 1024 * 1024))),
+    sizeof=lambda chunks: sum(len(chunk.encode('utf-8')) for chunk in chunks)
+)
+
+# Brave results (with scraped content) keyed by normalized query; empty
+# result sets are never cached so failures are retried on the next call, and
+# results where a scrape ran out of time (snippet only) expire after
+# SEARCH_CACHE_PARTIAL_TTL so the pages are scraped again soon
+SEARCH_CACHE_PARTIAL_TTL = float(os.getenv('SEARCH_CACHE_PARTIAL_TTL', '60'))
+search_cache = AsyncTTLCache(
+    maxsize=int(os.getenv('SEARCH_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('SEARCH_CACHE_TTL', '3600')),
+    should_cache=bool,
+    ttl_for=lambda sources: SEARCH_CACHE_PARTIAL_TTL if any(source.content is None for source in sources) else None
+)
+# Single-flight only (nothing is kept): concurrent identical Brave calls share one request
+brave_calls = AsyncTTLCache(should_cache=lambda results: False)
+# Brave results of hedged variants that lost the race, not yet scraped: a
+# later search for that variant skips the Brave call but still scrapes
+hedge_results = AsyncTTLCache(
+    maxsize=int(os.getenv('SEARCH_CACHE_SIZE', '512')),
+    ttl=SEARCH_CACHE_PARTIAL_TTL,
+    should_cache=bool
+)
+
+GEMINI_SAFETY_MESSAGE = "I apologize, but I cannot provide a response to that query due to content safety guidelines. Please try rephrasing your request."
+
 class Message(BaseModel):
     role: str
     content: str
@@ -74,122 +184,281 @@ class SimpleMessage(BaseModel):
 
 async def scrape_page_content(url: str) -> str:
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return ""
-                html = await response.text()
-                
-                # Basic HTML cleaning - remove scripts, styles, etc.
-                html = html.split('<script')[0]  # Remove script tags and everything after
-                html = '\n'.join(
-                    line
-                    for line in html.split('\n')
-                    if not any(tag in line.lower() for tag in ['<style', '<script', '<meta', '<link'])
-                )
-                
-                # Remove remaining HTML tags
-                text = ''
-                in_tag = False
-                for char in html:
-                    if char == '<':
-                        in_tag = True
-                    elif char == '>':
-                        in_tag = False
-                    elif not in_tag:
-                        text += char
-                
-                # Clean up whitespace
-                text = ' '.join(text.split())
-                
-                # Return first 5000 characters
-                return text[:5000]
+        # Stream the body through the extractor and stop once we have the
+        # first 5000 characters of visible text; the page store serves
+        # fresh or unchanged (304) pages without re-extracting them
+        text = await page_store.fetch(
+            url,
+            kind='text',
+            extract=lambda response: extract_text_from_response(response, limit=5000),
+            before_request=lambda: scrape_limiter.acquire(host_key(url))
+        )
+        return text or ""
     except Exception as e:
         print(f"Error scraping content from {url}: {e}")
         return ""
 
-async def search_brave(query: str, retries: int = 2) -> List[Source]:
-    for attempt in range(retries):
+async def scrape_sources(sources: List[Source], deadline: float) -> List[Source]:
+    """Scrape all sources concurrently, leaving content unset for any that miss the deadline"""
+    semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+
+    async def scrape(source: Source) -> None:
+        async with semaphore:
+            try:
+                with span('scrape', desc=urlparse(source.url).netloc):
+                    source.content = await asyncio.wait_for(scrape_page_content(source.url), SCRAPE_URL_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"Scrape of {source.url} exceeded {SCRAPE_URL_TIMEOUT}s, using snippet")
+
+    tasks = [asyncio.create_task(scrape(source)) for source in sources]
+    if not tasks:
+        return sources
+
+    remaining = max(0.0, deadline - asyncio.get_running_loop().time())
+    _, pending = await asyncio.wait(tasks, timeout=remaining)
+    if pending:
+        # Out of budget: whatever is still running falls back to its Brave snippet
+        print(f"Search budget exhausted, {len(pending)} scrape(s) fall back to snippets")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return sources
+
+async def search_brave(query: str) -> List[Source]:
+    sources = await search_cache.get_or_load(
+        normalize_query(query),
+        lambda: fetch_brave_sources(query)
+    )
+    # Callers get their own copies so the cached entry is never mutated
+    return [source.model_copy() for source in sources]
+
+async def fetch_brave_sources(query: str, deadline: Optional[float] = None, results: Optional[List[Source]] = None) -> List[Source]:
+    """Brave results for `query` with their pages scraped, within the search budget.
+
+    `results` skips the Brave call when the caller already has them.
+    """
+    if deadline is None:
+        deadline = asyncio.get_running_loop().time() + SEARCH_BUDGET
+    if results is None:
+        results = await brave_results(query, deadline)
+    # Scrape content from the pages
+    sources = await scrape_sources([result.model_copy() for result in results], deadline)
+    search_index.add_later(sources)
+    return sources
+
+async def brave_results(query: str, deadline: float, speculative: bool = False) -> List[Source]:
+    """Brave's results for `query` as snippet-only sources; concurrent identical calls share one request"""
+    key = normalize_query(query)
+    found, results = hedge_results.get(key)
+    if found:
+        hedge_results.hits += 1
+        hedge_results.invalidate(key)
+        return results
+    return await brave_calls.get_or_load(key, lambda: fetch_brave_results(query, deadline, speculative))
+
+async def fetch_brave_results(query: str, deadline: float, speculative: bool = False) -> List[Source]:
+    """Brave's results for `query`; a `speculative` (hedged) call only takes a Brave slot that is free now"""
+    loop = asyncio.get_running_loop()
+    session = await http_client.get_session()
+
+    async def send() -> aiohttp.ClientResponse:
+        # Queue behind other searches (in every worker) for a Brave slot, but not past the budget;
+        # hedges never queue, so they cannot use up the slots real searches are waiting for
+        max_wait = 0.0 if speculative else max(0.0, deadline - loop.time())
+        await brave_limiter.acquire(max_wait=max_wait)
+        return await session.get(
+            API_URLS['brave'],
+            headers={'X-Subscription-Token': BRAVE_API_KEY},
+            params={
+                'q': query,
+                'count': 5,
+                'search_lang': 'en',
+                'safesearch': 'moderate'
+            },
+            timeout=http_client.timeout('search')
+        )
+
+    started = time.perf_counter()
+    try:
+        # Retries 429/5xx and connection errors with backoff, within the search budget
+        response = await upstreams.get('brave').request(send, deadline=deadline)
+    except (RateLimitExceeded, CircuitOpenError) as e:
+        BRAVE_ERRORS.inc(reason=type(e).__name__)
+        print(f"Skipping Brave search: {e}")
+        return []
+    except Exception as e:
+        BRAVE_ERRORS.inc(reason=type(e).__name__)
+        print(f"Unexpected error in search_brave: {e}")
+        return []
+
+    async with response:
+        BRAVE_DURATION.observe(time.perf_counter() - started, status=str(response.status))
+        record_span('brave', time.perf_counter() - started, desc=query, status=response.status)
+        if response.status != 200:
+            BRAVE_ERRORS.inc(reason=str(response.status))
+            print(f"Brave Search API error: {response.status}")
+            return []
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    API_URLS['brave'],
-                    headers={'X-Subscription-Token': BRAVE_API_KEY},
-                    params={
-                        'q': query,
-                        'count': 5,
-                        'search_lang': 'en',
-                        'safesearch': 'moderate'
-                    }
-                ) as response:
-                    if response.status != 200:
-                        print(f"Brave Search API error: {response.status} (Attempt {attempt + 1}/{retries})")
-                        if attempt < retries - 1:
-                            await asyncio.sleep(1)
-                            continue
-                        return []
-                    
-                    try:
-                        data = await response.json()
-                        sources = []
-                        results = data.get('web', {}).get('results', [])
-                        
-                        for result in results[:5]:
-                            if result.get('url') and result.get('title'):
-                                # Scrape content from the page
-                                content = await scrape_page_content(result.get('url'))
-                                
-                                sources.append(Source(
-                                    title=result.get('title', 'No Title').strip(),
-                                    url=result.get('url', '').strip(),
-                                    snippet=result.get('description', '').strip(),
-                                    content=content
-                                ))
-                        
-                        return sources
-                        
-                    except Exception as e:
-                        print(f"Error processing search results: {e} (Attempt {attempt + 1}/{retries})")
-                        if attempt < retries - 1:
-                            await asyncio.sleep(1)
-                            continue
+            results = (await response.json()).get('web', {}).get('results', [])
         except Exception as e:
-            print(f"Unexpected error in search_brave: {e} (Attempt {attempt + 1}/{retries})")
-            if attempt < retries - 1:
-                await asyncio.sleep(1)
+            BRAVE_ERRORS.inc(reason='invalid_response')
+            print(f"Error processing search results: {e}")
+            return []
+
+    sources = []
+    for result in results[:5]:
+        if result.get('url') and result.get('title'):
+            sources.append(Source(
+                title=result.get('title', 'No Title').strip(),
+                url=result.get('url', '').strip(),
+                snippet=result.get('description', '').strip()
+            ))
+    return sources
+
+def _try_spend_hedge() -> bool:
+    """Reserve one speculative Brave call if the per-minute hedge budget allows it"""
+    now = time.monotonic()
+    while _hedge_launches and now - _hedge_launches[0] > 60:
+        _hedge_launches.popleft()
+    if len(_hedge_launches) >= SEARCH_HEDGE_MAX_PER_MINUTE:
+        return False
+    _hedge_launches.append(now)
+    return True
+
+def _cache_loser(query: str, task: asyncio.Task) -> None:
+    """Keep a losing variant's Brave results for a while instead of wasting the call"""
+    _hedge_losers.discard(task)
+    if task.cancelled() or task.exception() is not None:
+        return
+    results, scraped = task.result()
+    if results and not scraped:
+        hedge_results.set(normalize_query(query), results)
+
+async def _search_variant(query: str, deadline: float, speculative: bool) -> tuple[List[Source], bool]:
+    """Cached sources for `query` if any (scraped=True), else Brave's snippet-only results"""
+    found, sources = search_cache.get(normalize_query(query))
+    if found:
+        return [source.model_copy() for source in sources], True
+    return await brave_results(query, deadline, speculative), False
+
+async def hedged_search(queries: List[str]) -> List[Source]:
+    """Return the first non-empty result set among the query variants.
+
+    Variants are tried in order. Unless hedging is off, a later variant's
+    Brave call is also started speculatively while an earlier one has not
+    answered yet; the first non-empty answer wins and only its pages are
+    scraped. Losing calls are left to finish into hedge_results.
+    """
+    if SEARCH_HEDGE_MODE == 'off':
+        for query in queries:
+            sources = await search_brave(query)
+            if sources:
+                return sources
+        return []
+
+    deadline = asyncio.get_running_loop().time() + SEARCH_BUDGET
+    running = {}
+    next_index = 0
+    hedging = True
+
+    def launch() -> None:
+        nonlocal next_index
+        # Started while another variant is still in flight: a hedge
+        speculative = bool(running)
+        running[asyncio.create_task(_search_variant(queries[next_index], deadline, speculative))] = next_index
+        next_index += 1
+
+    launch()
+    if SEARCH_HEDGE_MODE == 'parallel':
+        while next_index < len(queries) and _try_spend_hedge():
+            launch()
+
+    try:
+        while running:
+            timeout = SEARCH_HEDGE_DELAY if hedging and next_index < len(queries) else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Still waiting after the hedge delay: start the next variant early
+                if _try_spend_hedge():
+                    launch()
+                else:
+                    hedging = False
                 continue
-    
-    return []
 
-async def enhance_prompt_with_search(message: str) -> tuple[str, List[Source]]:
-    # Try to get sources for the exact query
-    sources = await search_brave(message)
-    
-    # If no sources found, try with a more SEO-focused query
-    if not sources:
-        seo_query = f"Las Vegas SEO {message}"
-        sources = await search_brave(seo_query)
-    
-    # If still no sources, try one last time with a broader query
-    if not sources:
-        broader_query = f"digital marketing {message}"
-        sources = await search_brave(broader_query)
+            for task in sorted(done, key=running.get):
+                query = queries[running.pop(task)]
+                results, scraped = task.result()
+                if not results:
+                    continue
+                if scraped:
+                    return results
+                sources = await search_cache.get_or_load(
+                    normalize_query(query),
+                    lambda: fetch_brave_sources(query, deadline, results)
+                )
+                return [source.model_copy() for source in sources]
+
+            # Everything in flight came back empty: fall back to the next variant
+            if not running and next_index < len(queries):
+                launch()
+        return []
+    finally:
+        for task, index in running.items():
+            _hedge_losers.add(task)
+            task.add_done_callback(functools.partial(_cache_loser, queries[index]))
+
+async def enhance_prompt_with_search(message: str, provider: Optional[str] = None) -> tuple[str, List[Source]]:
+    # Pages seen before and our own blog posts first; the web only when they fall short
+    try:
+        with span('local_search') as attributes:
+            hits, sufficient = await search_index.lookup(message)
+            attributes.update(hits=len(hits), sufficient=sufficient)
+    except Exception as e:
+        print(f"Local search failed: {e}")
+        hits, sufficient = [], False
+    local_sources = [
+        Source(title=hit.title, url=hit.url, snippet=hit.snippet, content=hit.content)
+        for hit in hits if hit.coverage >= search_index.min_coverage
+    ]
+
+    if sufficient:
+        SEARCH_ANSWERS.inc(source='local')
+        sources = local_sources
+    else:
+        # Exact query first, then a more SEO-focused query, then a broader one
+        sources = await hedged_search([
+            message,
+            f"Las Vegas SEO {message}",
+            f"digital marketing {message}"
+        ])
+        SEARCH_ANSWERS.inc(source='brave' if sources else 'none')
+        seen = {canonical_url(source.url) for source in sources}
+        sources += [source for source in local_sources if canonical_url(source.url) not in seen]
     
     if not sources:
         return message, []
     
-    enhanced_prompt = (
+    with span('prompt') as attributes:
+        context = pack_context(message, sources, context_budget(provider), chars_per_token(provider))
+        attributes.update(tokens=context.tokens_used, saved=context.tokens_saved)
+        CONTEXT_TOKENS.inc(context.tokens_used, kind='packed')
+        CONTEXT_TOKENS.inc(context.tokens_saved, kind='saved')
+        print(
+            f"Search context: {context.chunks_used}/{context.chunks_total} passages, "
+            f"{context.tokens_used} tokens (saved {context.tokens_saved} of {context.tokens_available})"
+        )
+        return build_search_prompt(message, context.text), sources
+
+def build_search_prompt(message: str, context: str) -> str:
+    if not context:
+        return message
+    return (
         f"{message}\n\n"
         f"Here is some relevant information from trusted sources:\n\n"
+        f"{context}"
     )
-    
-    for source in sources:
-        if source.content:
-            enhanced_prompt += f"From {source.title}:\n{source.content[:1000]}...\n\n"
-        elif source.snippet:
-            enhanced_prompt += f"From {source.title}:\n{source.snippet}\n\n"
-    
-    return enhanced_prompt, sources
 
 async def stream_response(generator: AsyncGenerator) -> StreamingResponse:
     async def stream_generator():
@@ -205,320 +474,408 @@ async def stream_response(generator: AsyncGenerator) -> StreamingResponse:
         media_type="text/event-stream"
     )
 
-async def stream_deepseek_api(messages: List[Message], use_search: bool = False) -> AsyncGenerator:
+async def open_llm_stream(
+    provider: str,
+    name: str,
+    send: Callable[[], Awaitable[aiohttp.ClientResponse]]
+) -> aiohttp.ClientResponse:
+    """Open a provider's streaming response, retrying before the first token.
+
+    Provider-side failures surface as 5xx HTTPExceptions (503 when
+    throttled or the circuit is open, 502 for upstream errors) so the router
+    fails over. Other 4xx (bad request, bad key) keep their status: another
+    provider would not fix them, so the router does not fail over.
+    """
+    try:
+        response = await upstreams.get(provider).request(send)
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise HTTPException(status_code=502, detail=f"{name} API unreachable: {e!r}")
+
+    if response.status != 200:
+        async with response:
+            error_text = await response.text()
+        print(f"{name} API error {response.status}: {error_text}")
+        if response.status == 429:
+            status_code = 503
+        elif 400 <= response.status < 500:
+            status_code = response.status
+        else:
+            status_code = 502
+        raise HTTPException(status_code=status_code, detail=f"{name} API request failed ({response.status}): {error_text[:200]}")
+    return response
+
+def with_system_message(messages: List[Message]) -> List[Message]:
+    """Prepend the persona prompt, folding in leading system messages (e.g. a history summary)"""
+    extra = []
+    while len(extra) < len(messages) - 1 and messages[len(extra)].role == 'system':
+        extra.append(messages[len(extra)].content)
+    system = Message(**SYSTEM_MESSAGE)
+    if extra:
+        system = Message(role=system.role, content='\n\n'.join([system.content] + extra))
+    return [system] + messages[len(extra):]
+
+async def stream_openai_compatible(
+    provider: str,
+    api_key: Optional[str],
+    messages: List[Message],
+    use_search: bool = False
+) -> AsyncGenerator:
+    """Stream a chat completion from any provider speaking the OpenAI SSE protocol"""
+    name, model = OPENAI_COMPATIBLE_MODELS[provider]
     last_message = messages[-1]
     sources = None
     
     if use_search:
-        enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content)
+        enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content, provider)
         messages = messages[:-1] + [Message(role=last_message.role, content=enhanced_prompt)]
     
     # Add system message to the beginning of the messages list
-    messages_with_system = [Message(**SYSTEM_MESSAGE)] + messages
+    messages_with_system = with_system_message(messages)
     
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            API_URLS['deepseek'],
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {DEEPSEEK_API_KEY}'
-            },
-            json={
-                'model': 'deepseek-chat',
-                'messages': [{'role': m.role, 'content': m.content} for m in messages_with_system],
-                'temperature': 0.7,
-                'max_tokens': 1000,
-                'stream': True
-            }
-        ) as response:
-            if response.status != 200:
-                raise HTTPException(status_code=500, detail='DeepSeek API request failed')
-            
-            async for line in response.content:
-                if line:
-                    try:
-                        data = json.loads(line.decode('utf-8').strip('data: ').strip())
-                        if data != '[DONE]':
-                            content = data['choices'][0]['delta'].get('content', '')
-                            if content:
-                                yield {'content': content, 'sources': None}
-                    except Exception as e:
-                        print(f"Error parsing streaming response: {e}")
-            
-            if sources:
-                yield {'content': '', 'sources': [s.dict() for s in sources]}
+    session = await http_client.get_session()
+    response = await open_llm_stream(provider, name, lambda: session.post(
+        API_URLS[provider],
+        headers={
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {api_key}'
+        },
+        json={
+            'model': model,
+            'messages': [{'role': m.role, 'content': m.content} for m in messages_with_system],
+            'temperature': 0.7,
+            'max_tokens': 1000,
+            'stream': True
+        },
+        timeout=http_client.timeout('llm')
+    ))
+    async with response:
+        async for data in iter_sse_json(response):
+            if 'error' in data:
+                raise HTTPException(status_code=500, detail=f"{name} API error: {data['error']}")
+            choices = data.get('choices')
+            if choices:
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    yield {'content': content, 'sources': None}
+        
+        if sources:
+            yield {'content': '', 'sources': [s.model_dump() for s in sources]}
+
+async def stream_deepseek_api(messages: List[Message], use_search: bool = False) -> AsyncGenerator:
+    async for chunk in stream_openai_compatible('deepseek', DEEPSEEK_API_KEY, messages, use_search):
+        yield chunk
 
 async def stream_openai_api(messages: List[Message], use_search: bool = False) -> AsyncGenerator:
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail='OpenAI API key not configured')
     
-    last_message = messages[-1]
-    sources = None
-    
-    if use_search:
-        enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content)
-        messages = messages[:-1] + [Message(role=last_message.role, content=enhanced_prompt)]
-    
-    # Add system message to the beginning of the messages list
-    messages_with_system = [Message(**SYSTEM_MESSAGE)] + messages
-    
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            API_URLS['openai'],
-            headers={
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {OPENAI_API_KEY}'
-            },
-            json={
-                'model': 'gpt-4',
-                'messages': [{'role': m.role, 'content': m.content} for m in messages_with_system],
-                'temperature': 0.7,
-                'max_tokens': 1000,
-                'stream': True
-            }
-        ) as response:
-            if response.status != 200:
-                raise HTTPException(status_code=500, detail='OpenAI API request failed')
-            
-            async for line in response.content:
-                if line:
-                    try:
-                        data = json.loads(line.decode('utf-8').strip('data: ').strip())
-                        if data != '[DONE]':
-                            content = data['choices'][0]['delta'].get('content', '')
-                            if content:
-                                yield {'content': content, 'sources': None}
-                    except Exception as e:
-                        print(f"Error parsing streaming response: {e}")
-            
-            if sources:
-                yield {'content': '', 'sources': [s.dict() for s in sources]}
+    async for chunk in stream_openai_compatible('openai', OPENAI_API_KEY, messages, use_search):
+        yield chunk
 
 async def stream_gemini_api(messages: List[Message], use_search: bool = False) -> AsyncGenerator:
     if not GEMINI_API_KEY:
         raise HTTPException(status_code=500, detail="Gemini API key not configured. Please set the VITE_GEMINI_API_KEY environment variable.")
 
-    messages_with_system = [Message(**SYSTEM_MESSAGE)] + messages
+    messages_with_system = with_system_message(messages)
     last_message = messages[-1]
     sources = None
     
     if use_search:
-        enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content)
+        enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content, 'gemini')
         messages_with_system = messages_with_system[:-1] + [Message(role=last_message.role, content=enhanced_prompt)]
 
     formatted_messages = []
     for msg in messages_with_system:
         # Map roles to either 'user' or 'model'
         role = "model" if msg.role in ["assistant", "system"] else "user"
+        # Gemini expects user and model turns to alternate: merge repeats
+        if formatted_messages and formatted_messages[-1]["role"] == role:
+            formatted_messages[-1]["parts"].append({"text": msg.content})
+            continue
         formatted_messages.append({
             "role": role,
             "parts": [{"text": msg.content}]
         })
 
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Content-Type": "application/json",
-                "x-goog-api-key": GEMINI_API_KEY
-            }
-            
-            data = {
-                "contents": formatted_messages,
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 1,
-                    "topP": 1,
-                    "maxOutputTokens": 2048
-                },
-                "safetySettings": [
-                    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
-                    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
-                    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_ONLY_HIGH"},
-                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
-                ]
-            }
-
-            print("Sending request to Gemini API...")
-            print(f"Formatted messages: {json.dumps(formatted_messages, indent=2)}")
-            
-            async with session.post(
-                API_URLS['gemini'],
-                headers=headers,
-                json=data
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"Gemini API error: {error_text}")
-                    raise HTTPException(status_code=500, detail=f"Gemini API request failed: {error_text}")
-
-                response_data = await response.json()
-                print(f"Gemini API response: {json.dumps(response_data, indent=2)}")
-                
-                # Handle list response format
-                if isinstance(response_data, list):
-                    # Concatenate text from all responses
-                    full_text = ""
-                    for resp in response_data:
-                        if resp.get("candidates"):
-                            for candidate in resp["candidates"]:
-                                if candidate.get("content") and candidate["content"].get("parts"):
-                                    for part in candidate["content"]["parts"]:
-                                        if part.get("text"):
-                                            full_text += part["text"]
-                                elif candidate.get("finishReason") == "SAFETY":
-                                    raise HTTPException(
-                                        status_code=400,
-                                        detail="I apologize, but I cannot provide a response to that query due to content safety guidelines. Please try rephrasing your request."
-                                    )
-                    
-                    if not full_text:
-                        raise HTTPException(status_code=500, detail="No valid response generated. Please try again.")
-                    
-                    response_data = {
-                        "candidates": [{
-                            "content": {
-                                "parts": [{"text": full_text}]
-                            }
-                        }]
-                    }
-
-                if not response_data.get("candidates"):
-                    print(f"No candidates in Gemini response: {response_data}")
-                    raise HTTPException(status_code=500, detail="No response generated. Please try again.")
-
-                full_text = ""
-                for candidate in response_data["candidates"]:
+        session = await http_client.get_session()
+        headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": GEMINI_API_KEY
+        }
+        
+        data = {
+            "contents": formatted_messages,
+            "generationConfig": {
+                "temperature": 0.7,
+                "topK": 1,
+                "topP": 1,
+                "maxOutputTokens": 2048
+            },
+            "safetySettings": [
+                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_ONLY_HIGH"},
+                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_ONLY_HIGH"},
+                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_ONLY_HIGH"},
+                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"}
+            ]
+        }
+
+        print("Sending request to Gemini API...")
+        print(f"Formatted messages: {json.dumps(formatted_messages, indent=2)}")
+        
+        response = await open_llm_stream('gemini', 'Gemini', lambda: session.post(
+            API_URLS['gemini'],
+            headers=headers,
+            params={"alt": "sse"},
+            json=data,
+            timeout=http_client.timeout('llm')
+        ))
+        async with response:
+            # alt=sse makes Gemini emit one SSE event per generated chunk,
+            # so each text part is forwarded as soon as it arrives
+            received_text = False
+            async for chunk in iter_sse_json(response):
+                if chunk.get("promptFeedback", {}).get("blockReason"):
+                    raise HTTPException(status_code=400, detail=GEMINI_SAFETY_MESSAGE)
+
+                for candidate in chunk.get("candidates", []):
                     if candidate.get("finishReason") == "SAFETY":
-                        raise HTTPException(
-                            status_code=400, 
-                            detail="I apologize, but I cannot provide a response to that query due to content safety guidelines. Please try rephrasing your request."
-                        )
-                    if "content" in candidate and "parts" in candidate["content"]:
-                        for part in candidate["content"]["parts"]:
-                            if "text" in part:
-                                full_text += part["text"]
-
-                if not full_text:
-                    raise HTTPException(status_code=500, detail="Empty response from Gemini API")
-
-                # Split response into smaller pieces for streaming
-                sentences = []
-                current_sentence = ""
-                for char in full_text:
-                    current_sentence += char
-                    # Check for end of sentence or numbered list item
-                    if char in ".!?" or (current_sentence.strip().endswith('.') and current_sentence.strip()[:-1].isdigit()):
-                        sentences.append(current_sentence.strip())
-                        current_sentence = ""
-                
-                if current_sentence.strip():
-                    sentences.append(current_sentence.strip())
-
-                for sentence in sentences:
-                    yield {"content": sentence + " ", "sources": None}
-                    await asyncio.sleep(0.1)  # 100ms delay
-
-                if sources:
-                    yield {"content": "", "sources": [s.model_dump() for s in sources]}
+                        raise HTTPException(status_code=400, detail=GEMINI_SAFETY_MESSAGE)
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            received_text = True
+                            yield {"content": part["text"], "sources": None}
+
+            if not received_text:
+                raise HTTPException(status_code=500, detail="Empty response from Gemini API")
 
+            if sources:
+                yield {"content": "", "sources": [s.model_dump() for s in sources]}
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Unexpected error in Gemini handler: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def observe_llm_stream(provider: str, stream: AsyncGenerator) -> AsyncGenerator:
+    """Pass a provider stream through, recording TTFT, duration, throughput and errors"""
+    started = time.perf_counter()
+    first_at = None
+    chunks = 0
+    outcome = 'cancelled'
+    try:
+        async for chunk in stream:
+            if first_at is None:
+                first_at = time.perf_counter()
+                LLM_TTFT.observe(first_at - started, provider=provider)
+            chunks += 1
+            yield chunk
+        outcome = 'success'
+    except Exception:
+        outcome = 'error'
+        LLM_ERRORS.inc(provider=provider)
+        raise
+    finally:
+        await stream.aclose()
+        finished = time.perf_counter()
+        LLM_DURATION.observe(finished - started, provider=provider, outcome=outcome)
+        if chunks > 1 and finished > first_at:
+            LLM_TOKENS_PER_SECOND.observe((chunks - 1) / (finished - first_at), provider=provider)
+
+PROVIDER_KEYS = {
+    'deepseek': lambda: DEEPSEEK_API_KEY,
+    'openai': lambda: OPENAI_API_KEY,
+    'gemini': lambda: GEMINI_API_KEY,
+}
+
+# Search is done once per /chat request, so the router's providers stream
+# already-enhanced messages with use_search off
+provider_router = ProviderRouter(
+    providers={
+        'deepseek': lambda messages: observe_llm_stream('deepseek', stream_deepseek_api(messages)),
+        'openai': lambda messages: observe_llm_stream('openai', stream_openai_api(messages)),
+        'gemini': lambda messages: observe_llm_stream('gemini', stream_gemini_api(messages)),
+    },
+    # Providers whose circuit is open are ranked last instead of waited on
+    available=lambda name: bool(PROVIDER_KEYS[name]()) and upstreams.get(name).breaker.state != 'open'
+)
+
+HISTORY_SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own later reference. Keep the user's goals, "
+    "their business details, questions still open and any recommendations already given. "
+    "Write at most a short paragraph of plain text, no preamble.\n\n"
+)
+
+# Background history summaries call providers directly: they must not skew
+# the router's win/error stats, and are labelled '{provider}_summary' in the
+# LLM metrics so chat latency is measured on chat traffic only
+SUMMARY_STREAMS = {
+    'deepseek': stream_deepseek_api,
+    'openai': stream_openai_api,
+    'gemini': stream_gemini_api,
+}
+
+async def summarize_history(provider: str, text: str) -> str:
+    """Model-written summary of older turns, requested in the background by the history manager"""
+    candidates = [provider] + [name for name in SUMMARY_STREAMS if name != provider]
+    name = next((name for name in candidates if name in SUMMARY_STREAMS and provider_router.available(name)), None)
+    if name is None:
+        raise HTTPException(status_code=502, detail="No provider available")
+    messages = [Message(role='user', content=HISTORY_SUMMARY_PROMPT + text)]
+    parts = []
+    async for chunk in observe_llm_stream(f'{name}_summary', SUMMARY_STREAMS[name](messages)):
+        if chunk.get('content'):
+            parts.append(chunk['content'])
+    return ''.join(parts)
+
+history_manager = HistoryManager(summarize=summarize_history)
+
+def log_provider_config() -> None:
+    """Report which API keys are configured; missing keys only disable that provider"""
+    configured = [name for name, key in PROVIDER_KEYS.items() if key()]
+    missing = [name for name in PROVIDER_KEYS if name not in configured]
+    print(f"LLM providers configured: {', '.join(configured) or 'none'}")
+    if missing:
+        print(f"LLM providers without an API key: {', '.join(missing)}")
+    if not BRAVE_API_KEY:
+        print("VITE_BRAVE_API_KEY is not set; web searches will return no sources")
+
+def completion_cache_key(model: str, messages: List[Message], sources: Optional[List[Source]]) -> str:
+    """Fingerprint of everything that shapes an answer: model, history and search context"""
+    digest = hashlib.sha256(model.encode('utf-8'))
+    for message in messages:
+        digest.update(b'\x00' + message.role.encode('utf-8') + b'\x00')
+        digest.update(' '.join(message.content.casefold().split()).encode('utf-8'))
+    for source in sources or []:
+        digest.update(b'\x01' + source.url.encode('utf-8') + b'\x00')
+        digest.update((source.content or source.snippet or '').encode('utf-8'))
+    return digest.hexdigest()
+
+async def cached_completion(
+    key: str,
+    live: Callable[[], AsyncGenerator],
+    cacheable: Callable[[], bool] = lambda: True
+) -> AsyncGenerator:
+    """Replay a cached answer chunk by chunk, or stream it live and cache it once complete.
+
+    `cacheable` is asked once the live stream is over, e.g. to skip answers
+    from a provider other than the one the key was built for.
+    """
+    found, chunks = completion_cache.get(key)
+    if found:
+        completion_cache.hits += 1
+        for content in chunks:
+            yield {'content': content, 'sources': None}
+        return
+
+    completion_cache.misses += 1
+    chunks = []
+    async for chunk in live():
+        if chunk.get('content'):
+            chunks.append(chunk['content'])
+        yield chunk
+    # Only reached when the stream finished without error
+    if chunks and cacheable():
+        completion_cache.set(key, chunks)
+
+async def stream_chat(request: ChatRequest) -> AsyncGenerator:
+    trace = start_trace('chat')
+    sources = None
+
+    # Recent turns as they are, older ones folded into a cached summary
+    with span('history') as attributes:
+        window = history_manager.window(request.model, request.messages)
+        attributes.update(tokens=window.tokens_after, summarized=window.summarized)
+    HISTORY_TOKENS.inc(window.tokens_after, kind='sent')
+    HISTORY_TOKENS.inc(window.tokens_before - window.tokens_after, kind='saved')
+    messages = window.messages
+    if window.summary:
+        # Providers fold leading system messages into the persona prompt
+        messages = [Message(role='system', content=window.summary)] + messages
+    
+    if request.use_search:
+        last_message = messages[-1]
+        with span('search'):
+            enhanced_prompt, sources = await enhance_prompt_with_search(last_message.content, request.model)
+        messages = messages[:-1] + [Message(role=last_message.role, content=enhanced_prompt)]
+    
+    # The router may fail over to another provider; cached answers are only
+    # ever the requested model's own, so a replay is served by it too
+    served = {'provider': request.model}
+    key = completion_cache_key(request.model, request.messages, sources)
+    with span('llm', desc=request.model) as attributes:
+        started = time.perf_counter()
+        live = lambda: provider_router.stream(request.model, messages, on_serve=lambda name: served.update(provider=name))
+        async for chunk in cached_completion(key, live, cacheable=lambda: served['provider'] == request.model):
+            if 'ttft_ms' not in attributes:
+                attributes['ttft_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            yield chunk
+        attributes['provider'] = served['provider']
+    
+    if sources:
+        yield {'content': '', 'sources': [s.model_dump() for s in sources]}
+
+    # Final event: which provider answered and where this turn's time went
+    yield {'content': '', 'provider': served['provider'], 'timing': trace.finish()}
+
 @app.post("/api/chat")
 async def simple_chat(request: SimpleMessage):
     try:
         # Convert the simple message to our internal format
         messages = [Message(role="user", content=request.message)]
         
-        # Use Gemini as the default model
-        async for chunk in stream_gemini_api(messages):
+        # Use Gemini as the default model; collect the streamed chunks into one reply
+        parts = []
+        key = completion_cache_key('gemini', messages, None)
+        async for chunk in cached_completion(key, lambda: observe_llm_stream('gemini', stream_gemini_api(messages))):
             if chunk.get('content'):
-                return {"response": chunk['content']}
+                parts.append(chunk['content'])
         
+        if parts:
+            return {"response": "".join(parts)}
         return {"response": "I apologize, but I couldn't generate a response. Please try again."}
     except Exception as e:
         print(f"Error in simple_chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/seo/audit")
-async def seo_audit(request: Request):
-    try:
-        data = await request.json()
-        url = data.get('url')
-        if not url:
-            raise HTTPException(status_code=400, detail="URL is required")
-            
-        # Clean the URL before using it in the report
-        clean_url = url.replace(" ", "")
+AUDIT_KEYWORDS = [
+    "Las Vegas",
+    "Vegas",
+    "Nevada",
+    "NV",
+    "casino",
+    "resort",
+    "hotel",
+    "entertainment",
+    "tourism"
+]
+
+# Bulk audit limits: total pages per batch, pages fetched at once overall and per host
+AUDIT_MAX_URLS = int(os.getenv('AUDIT_MAX_URLS', '500'))
+AUDIT_CONCURRENCY = int(os.getenv('AUDIT_CONCURRENCY', '8'))
+AUDIT_PER_HOST_CONCURRENCY = int(os.getenv('AUDIT_PER_HOST_CONCURRENCY', '2'))
 
-        # Fetch the page content
-        async with aiohttp.ClientSession() as session:
-            async with session.get(clean_url) as response:
-                if response.status != 200:
-                    error_report = f"""Website Audit: {clean_url}
+class AuditBatchRequest(BaseModel):
+    urls: List[str] = []
+    sitemap: Optional[str] = None
+    format: str = 'ndjson'
+
+def http_error_report(url: str, status: int) -> str:
+    return f"""Website Audit: {url}
 
 Overview
-The URL {clean_url} does not appear to be accessible. The server returned a {response.status} error.
+The URL {url} does not appear to be accessible. The server returned a {status} error.
 
 Additional Notes
-- The page returned a {response.status} error code
+- The page returned a {status} error code
 - Please verify the URL is correct and the page is accessible
 - Check if the URL requires authentication or has restricted access"""
 
-                    return JSONResponse({
-                        "status": "error",
-                        "report": error_report
-                    })
-
-                html_content = await response.text()
-
-        # Parse HTML and extract text content
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
-        # Get text content
-        text_content = soup.get_text()
-        
-        # Clean up text (remove extra whitespace)
-        text_content = " ".join(text_content.split())
-
-        # Initialize the content analysis agent with page-specific focus
-        agent = ContentAnalysisAgent(
-            config=ContentAnalysisConfig(
-                important_keywords=[
-                    "Las Vegas",
-                    "Vegas",
-                    "Nevada",
-                    "NV",
-                    "casino",
-                    "resort",
-                    "hotel",
-                    "entertainment",
-                    "tourism"
-                ],
-                min_word_count=300,
-                max_keyword_density=2.5,
-                target_readability_score=60.0
-            )
-        )
-
-        # Analyze the content
-        metrics = await agent.analyze_content(text_content, html_content)
-        report = f"""Page Audit: {clean_url}
-
-{agent.generate_report(metrics)}"""
-
-        return JSONResponse({
-            "status": "success",
-            "report": report
-        })
-
-    except aiohttp.ClientError as e:
-        error_report = f"""Page Audit: {url}
+def connection_error_report(url: str) -> str:
+    return f"""Page Audit: {url}
 
 Overview
 Unable to access {url}. The page appears to be unavailable.
@@ -530,39 +887,269 @@ Additional Notes
   - The page is accessible
   - Your internet connection is stable"""
 
+async def analyze_page(url: str, html_content: str) -> dict:
+    """Run the content analysis agent over a fetched page in the CPU pool"""
+    # Imported on first audit: BeautifulSoup and TextBlob/NLTK are slow to load
+    from .agents.page_audit import audit_html
+    return await cpu_pool.run(audit_html, url, html_content, AUDIT_KEYWORDS)
+
+async def audit_url(url: str) -> dict:
+    """Fetch and audit one page; unreachable pages produce an error report instead of raising"""
+    with AUDIT_STAGE_DURATION.time(stage='total'):
+        try:
+            with AUDIT_STAGE_DURATION.time(stage='fetch'), span('fetch'):
+                session = await http_client.get_session()
+                async with session.get(url, timeout=http_client.timeout('scrape')) as response:
+                    if response.status != 200:
+                        return {"status": "error", "report": http_error_report(url, response.status)}
+
+                    html_content = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return {"status": "error", "report": connection_error_report(url)}
+
+        with AUDIT_STAGE_DURATION.time(stage='analyze'):
+            started = time.perf_counter()
+            result = await analyze_page(url, html_content)
+        # Worker-side stages, plus the time spent waiting for a pool slot and IPC
+        timings = result.get("timings", {})
+        record_span('queue', max(0.0, time.perf_counter() - started - sum(timings.values())))
+        for stage, seconds in timings.items():
+            record_span(stage, seconds)
+        return result
+
+@app.post("/api/seo/audit")
+async def seo_audit(request: Request):
+    try:
+        data = await request.json()
+        url = data.get('url')
+        if not url:
+            raise HTTPException(status_code=400, detail="URL is required")
+            
+        # Clean the URL before using it in the report
+        clean_url = url.replace(" ", "")
+
+        trace = start_trace('seo_audit')
+        result = await audit_url(clean_url)
+        server_timing = trace.server_timing()
+        trace.finish()
         return JSONResponse({
-            "status": "error",
-            "report": error_report
-        })
+            "status": result["status"],
+            "report": result["report"]
+        }, headers={"Server-Timing": server_timing, "Timing-Allow-Origin": "*"})
 
+    except HTTPException:
+        raise
+    except CpuPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Page analysis timed out")
     except Exception as e:
         print(f"Error in SEO audit: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+SITEMAP_MAX_BYTES = 10 * 1024 * 1024
+
+def parse_sitemap(body: bytes) -> ElementTree.Element:
+    """Parse remote sitemap XML, refusing DTDs and entity declarations.
+
+    Sitemaps never need either, and both enable entity-expansion and external
+    entity attacks. Sitemaps must be UTF-8, so a NUL byte (UTF-16/32 text
+    that would slip past the byte scan) is refused too.
+    """
+    if b'\x00' in body or b'<!DOCTYPE' in body or b'<!ENTITY' in body:
+        raise HTTPException(status_code=400, detail="Sitemap XML may not declare a DTD or entities")
+    try:
+        if SafeElementTree is not None:
+            return SafeElementTree.fromstring(body, forbid_dtd=True)
+        return ElementTree.fromstring(body)
+    except (ElementTree.ParseError, ValueError) as e:
+        # defusedxml's refusals are ValueErrors
+        raise HTTPException(status_code=400, detail=f"Invalid sitemap XML: {e}")
+
+async def fetch_sitemap_urls(
+    sitemap_url: str,
+    limit: int,
+    depth: int = 0,
+    visited: Optional[set] = None
+) -> List[str]:
+    """Collect page URLs from a sitemap, following one level of sitemap index"""
+    visited = visited if visited is not None else set()
+    visited.add(sitemap_url)
+
+    session = await http_client.get_session()
+    async with session.get(sitemap_url, timeout=http_client.timeout('scrape')) as response:
+        if response.status != 200:
+            raise HTTPException(status_code=400, detail=f"Sitemap returned {response.status}")
+        # read(n) only returns what is buffered, so read to EOF under a size cap
+        body = bytearray()
+        async for chunk in response.content.iter_chunked(65536):
+            body += chunk
+            if len(body) > SITEMAP_MAX_BYTES:
+                raise HTTPException(status_code=400, detail="Sitemap is larger than 10 MB")
+
+    root = parse_sitemap(bytes(body))
+    locs = [el.text.strip() for el in root.iter() if el.tag.endswith('loc') and el.text]
+    if not root.tag.endswith('sitemapindex'):
+        return locs[:limit]
+    if depth >= 1:
+        print(f"Skipping nested sitemap index {sitemap_url}")
+        return []
+
+    urls: List[str] = []
+    for child in locs:
+        if len(urls) >= limit:
+            break
+        if child in visited:
+            continue
+        try:
+            urls.extend(await fetch_sitemap_urls(child, limit - len(urls), depth + 1, visited))
+        except HTTPException as e:
+            print(f"Skipping sitemap {child}: {e.detail}")
+    return urls[:limit]
+
+async def audit_many(urls: List[str]) -> AsyncGenerator:
+    """Audit pages concurrently and yield each result as soon as it is ready"""
+    global_limit = asyncio.Semaphore(AUDIT_CONCURRENCY)
+    host_limits = {}
+
+    async def run(index: int, url: str) -> dict:
+        host = urlparse(url).netloc
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(AUDIT_PER_HOST_CONCURRENCY))
+        async with host_limit, global_limit:
+            try:
+                result = await audit_url(url)
+            except asyncio.TimeoutError:
+                result = {"status": "error", "report": f"Page Audit: {url}\n\nAudit failed: page analysis timed out"}
+            except Exception as e:
+                print(f"Error auditing {url}: {e}")
+                result = {"status": "error", "report": f"Page Audit: {url}\n\nAudit failed: {e}"}
+        return {"index": index, "url": url, **result}
+
+    tasks = [asyncio.create_task(run(i, url)) for i, url in enumerate(urls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away or the batch finished: drop anything still queued
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+@app.post("/api/seo/audit/batch")
+async def seo_audit_batch(request: AuditBatchRequest):
+    urls = [url.replace(" ", "") for url in request.urls if url.strip()]
+    if request.sitemap:
+        try:
+            urls += await fetch_sitemap_urls(request.sitemap.replace(" ", ""), AUDIT_MAX_URLS)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=400, detail=f"Unable to fetch sitemap: {e}")
+    # De-duplicate while keeping the client's order
+    urls = list(dict.fromkeys(urls))[:AUDIT_MAX_URLS]
+    if not urls:
+        raise HTTPException(status_code=400, detail="Provide a list of URLs or a sitemap URL")
+    if request.format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    async def results():
+        succeeded = 0
+        async for result in audit_many(urls):
+            succeeded += result["status"] == "success"
+            yield result
+        yield {"done": True, "total": len(urls), "succeeded": succeeded, "failed": len(urls) - succeeded}
+
+    if request.format == 'sse':
+        return await stream_response(results())
+
+    async def ndjson():
+        async for result in results():
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/http")
+async def http_pool_stats():
+    return {
+        **http_client.stats(),
+        "rate_limits": {"brave": brave_limiter.stats(), "scrape": scrape_limiter.stats()}
+    }
+
+@app.get("/health/providers")
+async def provider_stats():
+    return provider_router.snapshot()
+
+@app.get("/health/upstreams")
+async def upstream_stats():
+    return upstreams.stats()
+
+@app.get("/health/cache")
+async def cache_stats():
+    return {
+        "cpu_pool": cpu_pool.stats(),
+        "search": search_cache.stats(),
+        "hedge_results": hedge_results.stats(),
+        "pages": page_store.stats(),
+        "search_index": search_index.stats(),
+        "history": history_manager.stats(),
+        "completions": completion_cache.stats()
+    }
+
+def cache_metrics():
+    """Cache, page store, CPU pool and router gauges for /metrics"""
+    for name, stats in (("search", search_cache.stats()), ("completions", completion_cache.stats())):
+        yield "cache_hits", "Cache hits since start", {"cache": name}, stats["hits"]
+        yield "cache_misses", "Cache misses since start", {"cache": name}, stats["misses"]
+        yield "cache_hit_ratio", "Cache hits / lookups since start", {"cache": name}, stats["hit_ratio"]
+        yield "cache_entries", "Entries currently cached", {"cache": name}, stats["size"]
+
+    pages = page_store.stats()
+    served = pages["fresh_hits"] + pages["revalidated"] + pages["fetched"]
+    page_hit_ratio = round((pages["fresh_hits"] + pages["revalidated"]) / served, 4) if served else 0.0
+    yield "cache_hit_ratio", "Cache hits / lookups since start", {"cache": "pages"}, page_hit_ratio
+    for result in ("fresh_hits", "revalidated", "fetched", "coalesced", "errors"):
+        yield "page_store_requests", "Page store lookups by result since start", {"result": result}, pages[result]
+
+    index = search_index.stats()
+    for kind, count in index["documents"].items():
+        yield "search_index_documents", "Documents in the local search index", {"kind": kind}, count
+    for result in ("local_answers", "fallbacks"):
+        yield "search_index_lookups", "Local index lookups by outcome since start", {"result": result}, index[result]
+
+    pool = cpu_pool.stats()
+    yield "cpu_pool_pending", "CPU pool jobs queued or running", {}, pool["pending"]
+    for outcome in ("completed", "failed", "timeouts", "rejected"):
+        yield "cpu_pool_jobs", "CPU pool jobs by outcome since start", {"outcome": outcome}, pool[outcome]
+    yield "cpu_pool_restarts", "CPU process pools rebuilt after a worker died", {}, pool["restarts"]
+
+    for name, stats in provider_router.snapshot()["providers"].items():
+        yield "llm_streams_in_flight", "LLM streams currently open", {"provider": name}, stats["in_flight"]
+
+registry.register_collector(cache_metrics)
+
+def upstream_metrics():
+    """Circuit breaker and retry gauges per upstream for /metrics"""
+    for name, stats in upstreams.stats().items():
+        for state in ("closed", "half_open", "open"):
+            yield "upstream_circuit_state", "1 for the current breaker state of each upstream", {"upstream": name, "state": state}, int(stats["state"] == state)
+        yield "upstream_retry_tokens", "Retries the upstream's retry budget currently allows", {"upstream": name}, stats["retry_tokens"]
+        for outcome in ("requests", "retries", "failures", "rejected", "budget_exhausted"):
+            yield "upstream_calls", "Upstream calls and attempts by outcome since start", {"upstream": name, "outcome": outcome}, stats[outcome]
+
+registry.register_collector(upstream_metrics)
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
+    if request.model not in provider_router.providers:
+        raise HTTPException(status_code=400, detail=f"Unsupported model: {request.model}")
     try:
-        if request.model == 'deepseek':
-            return StreamingResponse(
-                stream_deepseek_api(request.messages, request.use_search),
-                media_type="text/event-stream"
-            )
-        elif request.model == 'openai':
-            return StreamingResponse(
-                stream_openai_api(request.messages, request.use_search),
-                media_type="text/event-stream"
-            )
-        elif request.model == 'gemini':
-            return StreamingResponse(
-                stream_gemini_api(request.messages, request.use_search),
-                media_type="text/event-stream"
-            )
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported model: {request.model}")
+        return await stream_response(stream_chat(request))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
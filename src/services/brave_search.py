@@ -2,7 +2,17 @@ from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import aiohttp
 import json
-import asyncio
+import os
+from .http_client import http_client
+from .cache import AsyncTTLCache, normalize_query
+from .rate_limit import brave_limiter
+from .resilience import upstreams
+
+# Shared by every BraveSearchTool instance, keyed by (normalized query, count)
+search_cache = AsyncTTLCache(
+    maxsize=int(os.getenv('SEARCH_CACHE_SIZE', '512')),
+    ttl=float(os.getenv('SEARCH_CACHE_TTL', '3600'))
+)
 
 class BraveSearchResult(BaseModel):
     title: str
@@ -42,23 +52,23 @@ class BraveSearchTool:
             "Accept": "application/json",
             "X-Subscription-Token": api_key
         }
-        self._last_request_time = 0
-        self._min_request_interval = 1.0  # Minimum time between requests in seconds
-    
-    async def _wait_for_rate_limit(self):
-        """Ensure we don't exceed rate limits"""
-        current_time = asyncio.get_event_loop().time()
-        time_since_last_request = current_time - self._last_request_time
-        if time_since_last_request < self._min_request_interval:
-            await asyncio.sleep(self._min_request_interval - time_since_last_request)
-        self._last_request_time = asyncio.get_event_loop().time()
     
     async def search(self, query: str, count: int = 5) -> BraveSearchResponse:
         """
-        Perform a search using Brave Search API and return structured results
+        Perform a search using Brave Search API and return structured results.
+        Repeated queries are served from the shared TTL/LRU cache.
         """
-        await self._wait_for_rate_limit()
-        
+        return await search_cache.get_or_load(
+            (normalize_query(query), count),
+            lambda: self._search_uncached(query, count)
+        )
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters for the shared search cache"""
+        return search_cache.stats()
+
+    async def _search_uncached(self, query: str, count: int) -> BraveSearchResponse:
         params = {
             "q": query,
             "count": count,
@@ -66,22 +76,29 @@ class BraveSearchTool:
             "safesearch": "moderate"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
+        session = await http_client.get_session()
+
+        async def send() -> aiohttp.ClientResponse:
+            # Shared with the API server's searches, across workers; retries queue for a slot too
+            await brave_limiter.acquire()
+            return await session.get(
                 self.base_url,
                 headers=self.headers,
-                params=params
-            ) as response:
-                if response.status == 429:
-                    print("Rate limited. Waiting before retry...")
-                    await asyncio.sleep(2)  # Wait 2 seconds before retry
-                    return await self.search(query, count)  # Retry the request
-                
-                if response.status != 200:
-                    raise Exception(f"Brave Search API error: {response.status}")
-                
-                data = await response.json()
-                return BraveSearchResponse(**data)
+                params=params,
+                timeout=http_client.timeout('search')
+            )
+
+        # Backs off on 429/5xx (honoring Retry-After) a bounded number of times
+        response = await upstreams.get('brave').request(send)
+        async with response:
+            if response.status == 429:
+                raise Exception("Brave Search API rate limit exceeded")
+            
+            if response.status != 200:
+                raise Exception(f"Brave Search API error: {response.status}")
+            
+            data = await response.json()
+            return BraveSearchResponse(**data)
 
     def format_results_for_context(self, results: BraveSearchResponse) -> str:
         """
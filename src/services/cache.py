@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import re
+import time
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query: lowercase, no punctuation, single spaces"""
+    return ' '.join(_PUNCTUATION.sub(' ', query.lower()).split())
+
+class AsyncTTLCache:
+    """In-process TTL + LRU cache with single-flight loading.
+
+    Concurrent get_or_load() calls for the same key share one in-flight
+    loader task, so a burst of identical requests costs one upstream call.
+    The load is cancelled only when every caller waiting on it is cancelled.
+    When `max_bytes` is set, `sizeof` measures each value and least recently
+    used entries are evicted until the total fits. `ttl_for` can give a
+    value its own TTL (e.g. shorter for partial results); None keeps `ttl`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: float = 3600.0,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.should_cache = should_cache or (lambda value: value is not None)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.ttl_for = ttl_for or (lambda value: None)
+        self._bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) without loading; expired entries count as missing"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self.invalidate(key)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self.invalidate(key)
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, size)
+        self._bytes += size
+        while len(self._entries) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # Shield so one cancelled caller doesn't cancel the load for everyone else
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter has gone away
+            task.exception()
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        if self.should_cache(value):
+            self.set(key, value, self.ttl_for(value))
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'inflight': len(self._inflight),
+            'hit_ratio': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
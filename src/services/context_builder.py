@@ -0,0 +1,164 @@
+from collections import Counter
+from math import ceil, log
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+import os
+import re
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+# Too common to say anything about relevance
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its just me more most my no nor not now of off on once only or
+other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours
+""".split())
+
+CHUNK_WORDS = 80
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def estimate_tokens(text: str, ratio: float = 4.0) -> int:
+    """Rough LLM token count at `ratio` characters per token (about four for English)"""
+    return ceil(len(text) / ratio)
+
+def chars_per_token(provider: Optional[str] = None) -> float:
+    """Token estimate ratio for a provider's tokenizer: {PROVIDER}_CHARS_PER_TOKEN, else CHARS_PER_TOKEN (4)"""
+    value = os.getenv(f'{provider.upper()}_CHARS_PER_TOKEN', '') if provider else ''
+    return float(value or os.getenv('CHARS_PER_TOKEN', '4'))
+
+def terms(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS and len(word) > 1]
+
+def context_budget(provider: Optional[str] = None) -> int:
+    """Context tokens for a provider: {PROVIDER}_CONTEXT_TOKENS, else CONTEXT_TOKENS (600)"""
+    value = os.getenv(f'{provider.upper()}_CONTEXT_TOKENS', '') if provider else ''
+    return int(value or os.getenv('CONTEXT_TOKENS', '600'))
+
+class Chunk(NamedTuple):
+    source: int
+    position: int
+    text: str
+    tokens: int
+
+class PackedContext(NamedTuple):
+    text: str
+    chunks_used: int
+    chunks_total: int
+    tokens_used: int
+    tokens_available: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_available - self.tokens_used
+
+def _sentences(text: str, max_words: int) -> Iterator[str]:
+    # Scraped menus and tables often have no punctuation: cut runs of words instead
+    for sentence in _SENTENCE_BREAK.split(' '.join(text.split())):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            yield ' '.join(words[start:start + max_words])
+
+def split_chunks(text: str, source: int, max_words: int = CHUNK_WORDS, ratio: float = 4.0) -> List[Chunk]:
+    """Consecutive sentences grouped into passages of up to `max_words` words, costed at `ratio` chars/token"""
+    chunks: List[Chunk] = []
+    sentences: List[str] = []
+    words = 0
+
+    def flush() -> None:
+        passage = ' '.join(sentences)
+        chunks.append(Chunk(source, len(chunks), passage, estimate_tokens(passage, ratio)))
+
+    for sentence in _sentences(text, max_words):
+        count = len(sentence.split())
+        if sentences and words + count > max_words:
+            flush()
+            sentences, words = [], 0
+        sentences.append(sentence)
+        words += count
+    if sentences:
+        flush()
+    return chunks
+
+def bm25_scores(query: str, chunks: Sequence[Chunk]) -> List[float]:
+    """Okapi BM25 of each chunk against the query, with the chunks as the corpus"""
+    query_terms = set(terms(query))
+    if not query_terms or not chunks:
+        return [0.0] * len(chunks)
+
+    frequencies = [Counter(terms(chunk.text)) for chunk in chunks]
+    lengths = [sum(counts.values()) for counts in frequencies]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    documents = len(chunks)
+    idf = {}
+    for term in query_terms:
+        containing = sum(1 for counts in frequencies if term in counts)
+        idf[term] = log(1 + (documents - containing + 0.5) / (containing + 0.5))
+
+    scores = []
+    for counts, length in zip(frequencies, lengths):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+        score = 0.0
+        for term in query_terms:
+            tf = counts.get(term)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+def pack_context(query: str, sources: Sequence[Any], budget: int, ratio: float = 4.0) -> PackedContext:
+    """Pack the passages of `sources` most relevant to `query` into `budget` tokens.
+
+    Sources need `title`, `content` and `snippet` attributes. Each source's
+    scraped content (or its snippet) is split into passages, ranked with
+    BM25 and packed greedily best-first; passages that match no query term
+    are only used when nothing matches. Selected passages are printed per
+    source in page order, with "..." marking skipped text. Passages are
+    costed at `ratio` characters per token, which should match the
+    provider the `budget` is for (see chars_per_token).
+    """
+    chunks: List[Chunk] = []
+    seen = set()
+    duplicate_tokens = 0
+    for index, source in enumerate(sources):
+        for chunk in split_chunks(source.content or source.snippet or '', index, ratio=ratio):
+            # Syndicated pages often repeat each other word for word
+            fingerprint = ' '.join(terms(chunk.text))
+            if fingerprint and fingerprint not in seen:
+                seen.add(fingerprint)
+                chunks.append(chunk)
+            else:
+                duplicate_tokens += chunk.tokens
+
+    scores = bm25_scores(query, chunks)
+    ranked = sorted(range(len(chunks)), key=lambda i: (-scores[i], chunks[i].source, chunks[i].position))
+    if any(scores):
+        ranked = [i for i in ranked if scores[i] > 0]
+
+    selected: Dict[int, List[Chunk]] = {}
+    used = 0
+    for i in ranked:
+        chunk = chunks[i]
+        if used + chunk.tokens <= budget:
+            selected.setdefault(chunk.source, []).append(chunk)
+            used += chunk.tokens
+
+    parts = []
+    for index in sorted(selected):
+        passages = sorted(selected[index], key=lambda chunk: chunk.position)
+        body = passages[0].text
+        for previous, chunk in zip(passages, passages[1:]):
+            body += (' ' if chunk.position == previous.position + 1 else ' ... ') + chunk.text
+        parts.append(f"From {sources[index].title}:\n{body}\n\n")
+
+    return PackedContext(
+        text=''.join(parts),
+        chunks_used=sum(len(passages) for passages in selected.values()),
+        chunks_total=len(chunks),
+        tokens_used=used,
+        # Duplicates dropped above were trimmed too
+        tokens_available=sum(chunk.tokens for chunk in chunks) + duplicate_tokens,
+    )
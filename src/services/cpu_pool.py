@@ -0,0 +1,149 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import multiprocessing
+import os
+
+class CpuPoolBusy(Exception):
+    """Raised when no execution slot frees up within the queue timeout"""
+
+MODES = ('process', 'thread', 'inline')
+
+class CpuPool:
+    """Runs CPU-bound work (HTML parsing, content analysis) off the event loop.
+
+    CPU_POOL_MODE selects 'process' (default, scales across cores), 'thread'
+    or 'inline' (run on the loop, for debugging). At most CPU_POOL_MAX_PENDING
+    jobs may be queued or running; callers wait up to CPU_POOL_QUEUE_TIMEOUT
+    for a slot before CpuPoolBusy is raised, and each job is bounded by
+    CPU_POOL_TIMEOUT. A job that times out keeps its worker until it finishes,
+    and keeps its slot too, so queue depth always reflects real load. If a
+    worker dies the process pool breaks; it is rebuilt on the next submit.
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.mode = 'process'
+        self.workers = 1
+        self.max_pending = 1
+        self.timeout = 30.0
+        self.queue_timeout = 5.0
+        self._counters: Dict[str, int] = {'completed': 0, 'failed': 0, 'timeouts': 0, 'rejected': 0, 'restarts': 0}
+        self._pending = 0
+
+    def _configure(self) -> None:
+        mode = os.getenv('CPU_POOL_MODE', 'process')
+        if mode not in MODES:
+            raise RuntimeError(f"CPU_POOL_MODE={mode!r} is not one of {', '.join(MODES)}")
+        self.mode = mode
+        self.workers = int(os.getenv('CPU_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.max_pending = int(os.getenv('CPU_POOL_MAX_PENDING', str(self.workers * 4)))
+        self.timeout = float(os.getenv('CPU_POOL_TIMEOUT', '30'))
+        self.queue_timeout = float(os.getenv('CPU_POOL_QUEUE_TIMEOUT', '5'))
+
+    def start(self) -> None:
+        """Create the executor; called from the FastAPI lifespan or lazily on first use"""
+        if self._executor is not None or self._slots is not None:
+            return
+        self._configure()
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._executor = self._make_executor()
+
+    def _make_executor(self) -> Optional[Executor]:
+        if self.mode == 'process':
+            # spawn avoids forking a process that already runs an event loop and threads
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        if self.mode == 'thread':
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cpu-pool')
+        return None
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        try:
+            return self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker crashed or was killed: replace the pool and retry once
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._make_executor()
+            self._counters['restarts'] += 1
+            return self._executor.submit(fn, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._slots = None
+        self._loop = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in the pool; `fn` and its arguments must be picklable in process mode"""
+        if self._loop is not asyncio.get_running_loop():
+            self.shutdown()
+        self.start()
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._counters['rejected'] += 1
+            raise CpuPoolBusy(f"CPU pool saturated ({self.max_pending} jobs pending)")
+
+        if self._executor is None:
+            # Inline mode: run on the loop, still counted against the slots
+            try:
+                return self._finish(fn(*args))
+            except Exception:
+                self._counters['failed'] += 1
+                raise
+            finally:
+                self._slots.release()
+
+        self._pending += 1
+        slots, loop = self._slots, self._loop
+        try:
+            future = self._submit(fn, *args)
+        except Exception:
+            self._counters['failed'] += 1
+            self._release(slots)
+            raise
+
+        def release(_):
+            # Runs in the executor's thread: hand the release back to the loop
+            try:
+                loop.call_soon_threadsafe(self._release, slots)
+            except RuntimeError:
+                pass  # loop already closed
+        future.add_done_callback(release)
+
+        try:
+            return self._finish(await asyncio.wait_for(asyncio.wrap_future(future), self.timeout))
+        except asyncio.TimeoutError:
+            self._counters['timeouts'] += 1
+            raise
+        except Exception:
+            self._counters['failed'] += 1
+            raise
+
+    def _finish(self, result: Any) -> Any:
+        self._counters['completed'] += 1
+        return result
+
+    def _release(self, slots: asyncio.Semaphore) -> None:
+        self._pending -= 1
+        slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+            **self._counters,
+        }
+
+cpu_pool = CpuPool()
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import os
+import re
+from .context_builder import chars_per_token, estimate_tokens
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+# Older turns are folded into the summary this many messages at a time, so
+# the summarized prefix (and its cache key) only changes every other turn
+COMPACT_STEP = 4
+
+# Per-message overhead of role markers and separators in provider formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_FIRST_SENTENCES = re.compile(r'^.{1,200}?(?:[.!?](?=\s)|$)')
+
+def message_tokens(message: Any, ratio: float = 4.0) -> int:
+    return estimate_tokens(message.content, ratio) + MESSAGE_OVERHEAD_TOKENS
+
+def _gist(text: str) -> str:
+    text = ' '.join(text.split())
+    match = _FIRST_SENTENCES.match(text)
+    gist = match.group(0) if match else text[:200]
+    return gist if len(gist) == len(text) else gist + ' ...'
+
+def extractive_summary(messages: Sequence[Any], budget: int, ratio: float = 4.0) -> str:
+    """Opening line of each earlier message, keeping the first and the most recent that fit in `budget` tokens"""
+    lines = [
+        f"{'User' if message.role == 'user' else 'Assistant'}: {_gist(message.content)}"
+        for message in messages if message.role != 'system' and message.content.strip()
+    ]
+    if not lines:
+        return ''
+    # The first message usually states what the conversation is about
+    kept = [lines[0]]
+    used = estimate_tokens(SUMMARY_HEADER + lines[0], ratio)
+    recent: List[str] = []
+    for line in reversed(lines[1:]):
+        tokens = estimate_tokens(line, ratio) + 1
+        if used + tokens > budget:
+            break
+        recent.append(line)
+        used += tokens
+    if len(recent) < len(lines) - 1:
+        kept.append('...')
+    return SUMMARY_HEADER + '\n'.join(kept + recent[::-1])
+
+def transcript(messages: Sequence[Any], max_chars: int = 1500) -> str:
+    return '\n\n'.join(
+        f"{'User' if message.role == 'user' else 'Assistant'}: {message.content[:max_chars]}"
+        for message in messages if message.role != 'system'
+    )
+
+def _prefix_keys(messages: Sequence[Any]) -> List[str]:
+    """keys[i] fingerprints messages[:i + 1], all from one hashing pass"""
+    digest = hashlib.sha256()
+    keys = []
+    for message in messages:
+        digest.update(message.role.encode('utf-8') + b'\x00' + message.content.encode('utf-8') + b'\x01')
+        keys.append(digest.copy().hexdigest())
+    return keys
+
+class HistoryWindow(NamedTuple):
+    summary: Optional[str]
+    messages: List[Any]
+    summarized: int
+    tokens_before: int
+    tokens_after: int
+
+class HistoryManager:
+    """Keeps the history sent to a provider within a token budget.
+
+    The most recent messages that fit are sent as they are; everything older
+    is replaced by one summary message. A summary is cached per conversation
+    prefix, so it is built once and reused on every later turn that folds
+    the same messages. It is extractive (instant, no upstream call) unless
+    a `summarize` coroutine is given and HISTORY_SUMMARY_MODE is 'llm'; then
+    it is replaced in the background by a model-written summary that extends
+    the previous one instead of re-reading the whole conversation.
+
+    Budgets: {PROVIDER}_HISTORY_TOKENS or HISTORY_TOKENS (2000) for the
+    history, HISTORY_SUMMARY_TOKENS (400, at most half the history) of it
+    for the summary. Tokens are estimated at {PROVIDER}_CHARS_PER_TOKEN or
+    CHARS_PER_TOKEN (4) characters each, since the providers' tokenizers
+    are not available here.
+    """
+
+    def __init__(
+        self,
+        summarize: Optional[Callable[[str, str], Awaitable[str]]] = None,
+        max_summaries: int = 256
+    ):
+        self.summarize = summarize
+        self.max_summaries = max_summaries
+        # Prefix fingerprint -> (kind, text), least recently used first
+        self._summaries: 'OrderedDict[str, Tuple[str, str]]' = OrderedDict()
+        self._refining: Dict[str, asyncio.Task] = {}
+        self._counters: Dict[str, int] = {
+            'compacted': 0,
+            'summary_hits': 0,
+            'summary_misses': 0,
+            'llm_summaries': 0,
+            'llm_failures': 0,
+        }
+
+    def budget(self, provider: Optional[str] = None) -> int:
+        value = os.getenv(f'{provider.upper()}_HISTORY_TOKENS', '') if provider else ''
+        return int(value or os.getenv('HISTORY_TOKENS', '2000'))
+
+    def summary_budget(self, provider: Optional[str] = None) -> int:
+        """HISTORY_SUMMARY_TOKENS, but never more than half the history budget"""
+        return min(int(os.getenv('HISTORY_SUMMARY_TOKENS', '400')), self.budget(provider) // 2)
+
+    @property
+    def mode(self) -> str:
+        return os.getenv('HISTORY_SUMMARY_MODE', 'extractive')
+
+    def window(self, provider: str, messages: Sequence[Any]) -> HistoryWindow:
+        """The summary (if any) and recent messages to send; the last message is always kept"""
+        ratio = chars_per_token(provider)
+        tokens = [message_tokens(message, ratio) for message in messages]
+        total = sum(tokens)
+        budget = self.budget(provider)
+        if total <= budget or len(messages) < 2:
+            return HistoryWindow(None, list(messages), 0, total, total)
+
+        # Newest messages that fit next to the summary
+        room = budget - self.summary_budget(provider)
+        start = len(messages) - 1
+        used = tokens[-1]
+        while start > 0 and used + tokens[start - 1] <= room:
+            start -= 1
+            used += tokens[start]
+
+        cut = min(len(messages) - 1, -(-start // COMPACT_STEP) * COMPACT_STEP)
+        # Let the window open on a user turn, as providers expect
+        while cut < len(messages) - 1 and messages[cut].role != 'user':
+            cut += 1
+
+        summary = self._summary(provider, messages[:cut], ratio)
+        recent = list(messages[cut:])
+        self._counters['compacted'] += 1
+        after = estimate_tokens(summary, ratio) + MESSAGE_OVERHEAD_TOKENS + sum(tokens[cut:])
+        return HistoryWindow(summary, recent, cut, total, after)
+
+    def _summary(self, provider: str, older: Sequence[Any], ratio: float) -> str:
+        keys = _prefix_keys(older)
+        key = keys[-1]
+        cached = self._summaries.get(key)
+        if cached is not None:
+            self._summaries.move_to_end(key)
+            self._counters['summary_hits'] += 1
+            kind, text = cached
+        else:
+            self._counters['summary_misses'] += 1
+            kind, text = 'extractive', extractive_summary(older, self.summary_budget(provider), ratio)
+            self._store(key, kind, text)
+
+        if kind == 'extractive' and self.summarize and self.mode == 'llm' and key not in self._refining:
+            task = asyncio.ensure_future(self._refine(provider, older, keys))
+            self._refining[key] = task
+            task.add_done_callback(lambda done: self._refining.pop(key, None))
+        return text
+
+    def _store(self, key: str, kind: str, text: str) -> None:
+        self._summaries[key] = (kind, text)
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_summaries:
+            self._summaries.popitem(last=False)
+
+    async def _refine(self, provider: str, older: Sequence[Any], keys: List[str]) -> None:
+        # Extend the longest earlier prefix that already has a model-written summary
+        previous, start = '', 0
+        for index in range(len(keys) - 2, -1, -1):
+            cached = self._summaries.get(keys[index])
+            if cached and cached[0] == 'llm':
+                previous, start = cached[1][len(SUMMARY_HEADER):], index + 1
+                break
+
+        text = transcript(older[start:])
+        if previous:
+            text = f"Summary so far:\n{previous}\n\nLater messages:\n{text}"
+        try:
+            summary = await asyncio.wait_for(
+                self.summarize(provider, text),
+                timeout=float(os.getenv('HISTORY_SUMMARY_TIMEOUT', '30'))
+            )
+        except Exception as e:
+            self._counters['llm_failures'] += 1
+            print(f"History summary failed, keeping the extractive one: {e!r}")
+            return
+        summary = ' '.join(summary.split())[:int(self.summary_budget(provider) * chars_per_token(provider))]
+        if summary:
+            self._store(keys[-1], 'llm', SUMMARY_HEADER + summary)
+            self._counters['llm_summaries'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'summaries': len(self._summaries),
+            'refining': len(self._refining),
+            **self._counters,
+        }
@@ -0,0 +1,107 @@
+from html.parser import HTMLParser
+from typing import List, Optional
+import codecs
+
+# Elements whose contents are never visible text
+SKIP_TAGS = {'script', 'style', 'head', 'noscript', 'template', 'svg', 'iframe', 'object'}
+
+# Elements that separate words even when the markup has no whitespace between them
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul'
+}
+
+class HtmlTextExtractor(HTMLParser):
+    """Incremental HTML-to-text extractor.
+
+    Feed it the response body chunk by chunk; it drops script/style/head
+    content as it goes and reports `done` once `limit` visible characters
+    have been collected, so the caller can stop reading the socket.
+    """
+
+    def __init__(self, limit: int = 5000):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self._parts: List[str] = []
+        self._visible_chars = 0
+        self._skip_depth = {tag: 0 for tag in SKIP_TAGS}
+        self._skipping = 0
+
+    @property
+    def done(self) -> bool:
+        return self._visible_chars >= self.limit
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag == 'body' and self._skip_depth['head']:
+            # <head> is often left unclosed; <body> ends it implicitly
+            self._skipping -= self._skip_depth['head']
+            self._skip_depth['head'] = 0
+        if tag in SKIP_TAGS:
+            self._skip_depth[tag] += 1
+            self._skipping += 1
+        elif tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        if tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            if self._skip_depth[tag]:
+                self._skip_depth[tag] -= 1
+                self._skipping -= 1
+        elif tag in BLOCK_TAGS:
+            self._parts.append(' ')
+
+    def handle_data(self, data: str) -> None:
+        if self._skipping or self.done:
+            return
+        self._parts.append(data)
+        self._visible_chars += len(data.strip())
+
+    def text(self) -> str:
+        """Whitespace-normalized visible text, truncated to `limit` characters"""
+        return ' '.join(''.join(self._parts).split())[:self.limit]
+
+def html_to_text(html: str, limit: int = 5000) -> str:
+    """Extract visible text from a complete HTML document"""
+    extractor = HtmlTextExtractor(limit)
+    for start in range(0, len(html), 16384):
+        extractor.feed(html[start:start + 16384])
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.text()
+
+async def extract_text_from_response(
+    response,
+    limit: int = 5000,
+    max_bytes: int = 2_000_000,
+    chunk_size: int = 16384,
+    charset: Optional[str] = None
+) -> str:
+    """Stream an aiohttp response through HtmlTextExtractor.
+
+    Stops reading as soon as enough text has been collected or `max_bytes`
+    have been consumed, so memory stays bounded on very large pages.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(charset or response.charset or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    extractor = HtmlTextExtractor(limit)
+    consumed = 0
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        consumed += len(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done or consumed >= max_bytes:
+            break
+    else:
+        extractor.feed(decoder.decode(b'', final=True))
+
+    extractor.close()
+    return extractor.text()
@@ -0,0 +1,199 @@
+from typing import Dict, Optional, Any
+from pydantic import BaseModel, Field
+import aiohttp
+import asyncio
+import os
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if value.lower() == "none":
+        return None
+    return float(value)
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+class TimeoutProfile(BaseModel):
+    total: Optional[float] = None
+    connect: Optional[float] = None
+    sock_read: Optional[float] = None
+
+    def to_client_timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=self.total,
+            sock_connect=self.connect,
+            sock_read=self.sock_read
+        )
+
+class HttpClientConfig(BaseModel):
+    pool_limit: int = 100
+    pool_limit_per_host: int = 10
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    timeouts: Dict[str, TimeoutProfile] = Field(default_factory=dict)
+
+    @classmethod
+    def from_env(cls) -> "HttpClientConfig":
+        """Build the client configuration from HTTP_* environment variables"""
+        connect = _env_float('HTTP_CONNECT_TIMEOUT', 5.0)
+        return cls(
+            pool_limit=_env_int('HTTP_POOL_LIMIT', 100),
+            pool_limit_per_host=_env_int('HTTP_POOL_LIMIT_PER_HOST', 10),
+            dns_cache_ttl=_env_int('HTTP_DNS_CACHE_TTL', 300),
+            keepalive_timeout=_env_float('HTTP_KEEPALIVE_TIMEOUT', 30.0),
+            timeouts={
+                # Default for anything that doesn't ask for a profile
+                'default': TimeoutProfile(
+                    total=_env_float('HTTP_TOTAL_TIMEOUT', 30.0),
+                    connect=connect,
+                    sock_read=_env_float('HTTP_SOCK_READ_TIMEOUT', 15.0)
+                ),
+                'search': TimeoutProfile(
+                    total=_env_float('HTTP_SEARCH_TIMEOUT', 10.0),
+                    connect=connect
+                ),
+                'scrape': TimeoutProfile(
+                    total=_env_float('HTTP_SCRAPE_TIMEOUT', 10.0),
+                    connect=connect
+                ),
+                # LLM streams can run long, so only bound the gap between chunks
+                'llm': TimeoutProfile(
+                    total=_env_float('HTTP_LLM_TIMEOUT', None),
+                    connect=connect,
+                    sock_read=_env_float('HTTP_LLM_SOCK_READ_TIMEOUT', 60.0)
+                ),
+            }
+        )
+
+class HttpClient:
+    """Process-wide aiohttp session with a shared keep-alive pool and DNS cache.
+
+    The FastAPI lifespan calls start()/close(); scripts that never start it get
+    a session lazily on first use.
+    """
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        self._config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters: Dict[str, int] = {
+            'requests': 0,
+            'request_errors': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'connections_queued': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+
+    @property
+    def config(self) -> HttpClientConfig:
+        # Resolved lazily so a .env loaded after import is still honored
+        if self._config is None:
+            self._config = HttpClientConfig.from_env()
+        return self._config
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def count(name: str):
+            async def handler(session, context, params):
+                self._counters[name] += 1
+            return handler
+
+        trace_config.on_request_start.append(count('requests'))
+        trace_config.on_request_exception.append(count('request_errors'))
+        trace_config.on_connection_create_end.append(count('connections_created'))
+        trace_config.on_connection_reuseconn.append(count('connections_reused'))
+        trace_config.on_connection_queued_start.append(count('connections_queued'))
+        trace_config.on_dns_cache_hit.append(count('dns_cache_hits'))
+        trace_config.on_dns_cache_miss.append(count('dns_cache_misses'))
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.config.pool_limit,
+            limit_per_host=self.config.pool_limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.config.dns_cache_ttl,
+            keepalive_timeout=self.config.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout('default'),
+            trace_configs=[self._trace_config()]
+        )
+
+    async def start(self) -> None:
+        """Open the shared session (idempotent)"""
+        await self.get_session()
+
+    async def close(self) -> None:
+        """Close the shared session and release every pooled connection"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on the running loop if needed.
+
+        A session left open by an earlier, now closed loop (tests, scripts
+        calling asyncio.run twice) is closed before it is replaced; one still
+        open on another live loop must be closed there first.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is not loop:
+            if not self._loop.is_closed():
+                raise RuntimeError("HTTP client session is in use on another event loop; close() it there first")
+            await self._close_stale(self._session)
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    @staticmethod
+    async def _close_stale(session: aiohttp.ClientSession) -> None:
+        # Its connections died with the old loop; this marks the connector
+        # closed so the session is not reported as leaked
+        try:
+            await session.close()
+        except RuntimeError:
+            pass
+
+    def timeout(self, profile: str = 'default') -> aiohttp.ClientTimeout:
+        """Return the aiohttp timeout for a named profile (default/search/scrape/llm)"""
+        timeouts = self.config.timeouts
+        return (timeouts.get(profile) or timeouts.get('default') or TimeoutProfile()).to_client_timeout()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and connection reuse counters"""
+        stats: Dict[str, Any] = {
+            'open': bool(self._session and not self._session.closed),
+            'limit': self.config.pool_limit,
+            'limit_per_host': self.config.pool_limit_per_host,
+            'dns_cache_ttl': self.config.dns_cache_ttl,
+            **self._counters,
+            'acquired': 0,
+            'idle': 0,
+            'hosts': {},
+        }
+        connector = self._session.connector if stats['open'] else None
+        if connector is None:
+            return stats
+
+        hosts: Dict[str, Dict[str, int]] = {}
+        for key, conns in getattr(connector, '_acquired_per_host', {}).items():
+            hosts.setdefault(key.host, {'acquired': 0, 'idle': 0})['acquired'] += len(conns)
+        for key, conns in getattr(connector, '_conns', {}).items():
+            hosts.setdefault(key.host, {'acquired': 0, 'idle': 0})['idle'] += len(conns)
+
+        stats['acquired'] = sum(h['acquired'] for h in hosts.values())
+        stats['idle'] = sum(h['idle'] for h in hosts.values())
+        stats['hosts'] = hosts
+        return stats
+
+http_client = HttpClient()
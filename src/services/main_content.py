@@ -0,0 +1,310 @@
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import os
+import re
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the stdlib tokenizer is used without it
+    etree = None
+
+# Boilerplate subtrees dropped wholesale
+UNWANTED_TAGS = frozenset({
+    'nav', 'header', 'footer', 'script', 'style', 'iframe',
+    'noscript', 'aside', 'form', 'button', 'input', 'meta',
+    'svg', 'path', 'symbol', 'img', 'picture', 'video'
+})
+
+# Substrings of class / id attributes that mark ads, popups and similar chrome
+BOILERPLATE_CLASSES = ('ad-', 'advertisement', 'popup', 'cookie', 'newsletter', 'sidebar')
+BOILERPLATE_IDS = ('ad-', 'advertisement', 'popup')
+
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'
+})
+
+HEADING_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+PART_TAGS = HEADING_TAGS | {'p', 'li'}
+
+# Block elements whose start implicitly closes an open <p>
+CLOSES_P = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'
+})
+
+# A container must hold more visible characters than this to count as main content
+MIN_CONTENT_CHARS = 200
+
+# Without an explicit content container, the smallest block holding this
+# share of the page's non-link paragraph text is taken as the main content
+CONTENT_SHARE = 0.8
+
+# Skip paragraphs and list items that are (nearly) all link text: menus, tag clouds, "read more"
+MAX_LINK_DENSITY = 0.8
+
+_WHITESPACE = re.compile(r'\s+')
+_SPECIAL_CHARS = re.compile(r'[^\w\s.,!?;:()\-•\n]')
+
+class MainContent(NamedTuple):
+    title: str
+    text: str
+
+def _classes(attrs: Dict[str, Optional[str]]) -> Tuple[str, List[str]]:
+    value = attrs.get('class') or ''
+    return value, value.split()
+
+def _candidate_ranks(tag: str, attrs: Dict[str, Optional[str]]) -> List[int]:
+    """Ranks of the content-container rules this element satisfies (lower is preferred)"""
+    class_value, classes = _classes(attrs)
+    role = attrs.get('role')
+    element_id = attrs.get('id')
+    rules = (
+        tag == 'main',
+        tag == 'article',
+        role == 'main',
+        role == 'article',
+        'content' in classes,
+        'post-content' in classes,
+        'article-content' in classes,
+        'entry-content' in classes,
+        element_id == 'content',
+        'post' in classes,
+        'article' in classes,
+        'blog-post' in classes,
+        'content' in class_value,
+        tag == 'div' and 'container' in classes,
+    )
+    return [rank for rank, matched in enumerate(rules) if matched]
+
+def _is_boilerplate(attrs: Dict[str, Optional[str]]) -> bool:
+    class_value = attrs.get('class')
+    if class_value and any(marker in class_value for marker in BOILERPLATE_CLASSES):
+        return True
+    element_id = attrs.get('id')
+    return bool(element_id) and any(marker in element_id for marker in BOILERPLATE_IDS)
+
+class _Node:
+    __slots__ = ('tag', 'skip', 'part', 'text_len', 'link_len', 'score', 'first_part', 'end_part')
+
+    def __init__(self, tag: str, skip: bool, first_part: int):
+        self.tag = tag
+        self.skip = skip
+        self.part = False
+        self.text_len = 0
+        self.link_len = 0
+        self.score = 0
+        self.first_part = first_part
+        self.end_part = first_part
+
+class MainContentBuilder:
+    """Single-pass main-content extractor.
+
+    Receives parser events (start/end/data, the lxml target interface) and,
+    in one walk over the document, drops boilerplate subtrees, collects
+    headings, paragraphs and list items, and keeps per-element visible and
+    link text totals. The main container is then chosen from those totals:
+    the first content container (main, article, .content, ...) in rule order
+    that holds more than MIN_CONTENT_CHARS, otherwise the smallest block
+    holding CONTENT_SHARE of the page's paragraph text.
+    """
+
+    def __init__(self):
+        self._stack: List[_Node] = []
+        self._parts: List[Tuple[str, str]] = []
+        self._part_pieces: List[str] = []
+        self._part_node: Optional[_Node] = None
+        self._part_link_len = 0
+        self._link_depth = 0
+        self._title: Optional[List[str]] = None
+        self._in_title = False
+        self._candidates: Dict[int, _Node] = {}
+        self._closed: List[_Node] = []
+        self._body: Optional[_Node] = None
+        self._root = _Node('#document', False, 0)
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        stack = self._stack
+        if stack:
+            top = stack[-1].tag
+            if top == 'p' and tag in CLOSES_P:
+                self._pop(len(stack) - 1)
+            elif tag == 'li':
+                for index in range(len(stack) - 1, -1, -1):
+                    open_tag = stack[index].tag
+                    if open_tag == 'li':
+                        self._pop(index)
+                        break
+                    if open_tag in ('ul', 'ol'):
+                        break
+
+        parent_skip = bool(stack) and stack[-1].skip
+        skip = parent_skip or tag in UNWANTED_TAGS or _is_boilerplate(attrs)
+        node = _Node(tag, skip, len(self._parts))
+        stack.append(node)
+        if skip:
+            return
+
+        if tag == 'title' and self._title is None:
+            self._title = []
+            self._in_title = True
+        elif tag == 'a':
+            self._link_depth += 1
+        elif tag == 'body' and self._body is None:
+            self._body = node
+
+        if tag in PART_TAGS and self._part_node is None:
+            node.part = True
+            self._part_node = node
+            self._part_pieces = []
+            self._part_link_len = 0
+
+        for rank in _candidate_ranks(tag, attrs):
+            self._candidates.setdefault(rank, node)
+
+    def end(self, tag: str) -> None:
+        stack = self._stack
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index].tag == tag:
+                self._pop(index)
+                return
+        # Stray end tag without a matching start: ignore it
+
+    def data(self, text: str) -> None:
+        if self._in_title:
+            self._title.append(text)
+        stack = self._stack
+        if not stack or stack[-1].skip:
+            return
+        if self._part_node is not None:
+            self._part_pieces.append(text)
+        visible = len(text.strip())
+        if not visible:
+            return
+        node = stack[-1]
+        node.text_len += visible
+        if self._link_depth:
+            node.link_len += visible
+            if self._part_node is not None:
+                self._part_link_len += visible
+
+    def _pop(self, index: int) -> None:
+        stack = self._stack
+        while len(stack) > index:
+            node = stack.pop()
+            self._close(node, stack[-1] if stack else self._root)
+
+    def _close(self, node: _Node, parent: _Node) -> None:
+        if node.skip:
+            return
+        if node.tag == 'title':
+            self._in_title = False
+        elif node.tag == 'a':
+            self._link_depth -= 1
+
+        if node.part:
+            self._part_node = None
+            text = ' '.join(''.join(self._part_pieces).split())
+            if text and self._part_link_len <= MAX_LINK_DENSITY * node.text_len:
+                kind = 'heading' if node.tag in HEADING_TAGS else node.tag
+                self._parts.append((kind, text))
+                if kind != 'heading':
+                    node.score += node.text_len - self._part_link_len
+
+        node.end_part = len(self._parts)
+        parent.text_len += node.text_len
+        parent.link_len += node.link_len
+        parent.score += node.score
+        if node.score:
+            self._closed.append(node)
+
+    def _main_node(self) -> Optional[_Node]:
+        for rank in sorted(self._candidates):
+            node = self._candidates[rank]
+            if node.text_len > MIN_CONTENT_CHARS:
+                return node
+
+        # No labelled content container: pick the tightest block holding most of the prose
+        body = self._body or self._root
+        if body.score:
+            threshold = CONTENT_SHARE * body.score
+            return min(
+                (node for node in self._closed if node.score >= threshold),
+                key=lambda node: node.text_len,
+                default=body
+            )
+        return self._body
+
+    def close(self) -> MainContent:
+        self._pop(0)
+        title = ' '.join(''.join(self._title or ()).split())
+
+        main = self._main_node()
+        if main is None:
+            return MainContent(title=title, text='')
+
+        content_parts = []
+        for kind, text in self._parts[main.first_part:main.end_part]:
+            if kind == 'heading':
+                content_parts.append(f"\n{text}\n")
+            elif kind == 'li':
+                content_parts.append(f"• {text}")
+            else:
+                content_parts.append(text)
+
+        content = _WHITESPACE.sub(' ', '\n'.join(content_parts))
+        content = _SPECIAL_CHARS.sub('', content)
+        return MainContent(title=title, text=content.strip())
+
+class _StdlibFeeder(HTMLParser):
+    """Adapts html.parser callbacks to the builder's start/end/data interface"""
+
+    def __init__(self, builder: MainContentBuilder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self.builder.start(tag, dict(attrs))
+        if tag in VOID_TAGS:
+            self.builder.end(tag)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.builder.start(tag, dict(attrs))
+        self.builder.end(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in VOID_TAGS:
+            self.builder.end(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.builder.data(data)
+
+PARSER_BACKENDS = ('auto', 'lxml', 'html.parser')
+
+def _parser_backend(parser: Optional[str]) -> str:
+    choice = parser or os.getenv('CONTENT_PARSER', 'auto')
+    if choice not in PARSER_BACKENDS:
+        raise RuntimeError(f"CONTENT_PARSER={choice!r} is not one of {', '.join(PARSER_BACKENDS)}")
+    if choice == 'auto':
+        return 'lxml' if etree is not None else 'html.parser'
+    if choice == 'lxml' and etree is None:
+        raise RuntimeError("CONTENT_PARSER=lxml but lxml is not installed")
+    return choice
+
+def extract_main_content(html: str, parser: Optional[str] = None) -> MainContent:
+    """Title and cleaned main-content text of an HTML page, from one parse.
+
+    `parser` (or CONTENT_PARSER) selects 'lxml' or 'html.parser'; 'auto', the
+    default, uses lxml's C tokenizer when it is installed.
+    """
+    builder = MainContentBuilder()
+    if _parser_backend(parser) == 'lxml':
+        html_parser = etree.HTMLParser(target=builder)
+        html_parser.feed(html)
+        return html_parser.close()
+
+    feeder = _StdlibFeeder(builder)
+    feeder.feed(html)
+    feeder.close()
+    return builder.close()
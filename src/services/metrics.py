@@ -0,0 +1,217 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import time
+
+# Seconds: sub-millisecond cache hits up to slow LLM completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 60, 100, 150, 250, 500)
+SIZE_BUCKETS = (1024, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+LabelKey = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+            for key, value in self._values.items()
+        ]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)], sum
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def time(self, **labels: str) -> 'Timer':
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total[0])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+class Timer:
+    """Context manager observing elapsed seconds into a histogram"""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+# A collector returns (name, help, labels, value) gauge samples computed at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]
+
+class Registry:
+    """Process-local metrics in the Prometheus text exposition format.
+
+    Instruments update in place as the app runs; collectors turn existing
+    stats() snapshots (caches, pools) into gauges when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets or LATENCY_BUCKETS))
+
+    def register_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+
+        families: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, documentation, labels, value in collector():
+                _, samples = families.setdefault(name, (documentation, []))
+                samples.append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}')
+        for name, (documentation, samples) in families.items():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+class MetricsMiddleware:
+    """ASGI middleware tracking in-flight requests and latency per route.
+
+    Streaming responses count as in flight until their last body chunk is
+    sent, not just until headers go out. Paths that match no route are
+    grouped under "other" to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.in_flight = registry.gauge('http_requests_in_flight', 'Requests currently being served', ['path'])
+        self.latency = registry.histogram('http_request_duration_seconds', 'Time to serve a request, including streamed bodies', ['path', 'method', 'status'])
+        self._paths: Optional[frozenset] = None
+
+    def _path_label(self, scope) -> str:
+        if self._paths is None:
+            routes = getattr(scope.get('app'), 'routes', ())
+            self._paths = frozenset(getattr(route, 'path', None) for route in routes)
+        path = scope.get('path', '')
+        return path if path in self._paths else 'other'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        path = self._path_label(scope)
+        started = time.perf_counter()
+        status = {'code': '500'}
+        self.in_flight.inc(path=path)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = str(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec(path=path)
+            self.latency.observe(time.perf_counter() - started, path=path, method=scope.get('method', ''), status=status['code'])
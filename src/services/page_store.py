@@ -0,0 +1,222 @@
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from .http_client import http_client
+from .metrics import SIZE_BUCKETS, registry
+
+FETCH_DURATION = registry.histogram('page_fetch_duration_seconds', 'Page store lookups, including network fetches', ['kind', 'result'])
+FETCH_BYTES = registry.histogram('page_fetch_bytes', 'Response bytes read per fetched page', ['kind'], SIZE_BUCKETS)
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parents[2] / '.cache' / 'page_store.sqlite3'
+
+_TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share one store entry"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+class PageStore:
+    """On-disk store of extracted page content keyed by canonical URL.
+
+    Entries younger than `fresh_for` seconds are served without touching the
+    network. Older entries are revalidated with a conditional GET, so an
+    unchanged page costs a 304 and no re-extraction. Concurrent fetches of
+    the same page share one request.
+    """
+
+    def __init__(self, path: Optional[str] = None, fresh_for: Optional[float] = None):
+        self._path = path
+        self._fresh_for = fresh_for
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._counters: Dict[str, int] = {
+            'fresh_hits': 0,
+            'revalidated': 0,
+            'fetched': 0,
+            'coalesced': 0,
+            'errors': 0,
+        }
+
+    # Resolved lazily so a .env loaded after import is still honored
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = os.getenv('PAGE_STORE_PATH') or str(DEFAULT_STORE_PATH)
+        return Path(self._path)
+
+    @property
+    def fresh_for(self) -> float:
+        if self._fresh_for is None:
+            self._fresh_for = float(os.getenv('PAGE_STORE_FRESH_FOR', '21600'))
+        return self._fresh_for
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                ' kind TEXT NOT NULL,'
+                ' url TEXT NOT NULL,'
+                ' etag TEXT,'
+                ' last_modified TEXT,'
+                ' data TEXT NOT NULL,'
+                ' fetched_at REAL NOT NULL,'
+                ' validated_at REAL NOT NULL,'
+                ' PRIMARY KEY (kind, url))'
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _read(self, kind: str, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT etag, last_modified, data, fetched_at, validated_at FROM pages WHERE kind = ? AND url = ?',
+                (kind, url)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'data': json.loads(row[2]),
+            'fetched_at': row[3],
+            'validated_at': row[4],
+        }
+
+    def _write(self, kind: str, url: str, data: Any, etag: Optional[str], last_modified: Optional[str]) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                'INSERT OR REPLACE INTO pages (kind, url, etag, last_modified, data, fetched_at, validated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, url, etag, last_modified, json.dumps(data), now, now)
+            )
+            db.commit()
+
+    def _touch(self, kind: str, url: str) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute('UPDATE pages SET validated_at = ? WHERE kind = ? AND url = ?', (time.time(), kind, url))
+            db.commit()
+
+    def prune(self, older_than: float) -> int:
+        """Delete entries not revalidated within `older_than` seconds"""
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute('DELETE FROM pages WHERE validated_at < ?', (time.time() - older_than,))
+            db.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def fetch(
+        self,
+        url: str,
+        kind: str,
+        extract: Callable[[Any], Awaitable[Any]],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[Any] = None,
+        before_request: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Optional[Any]:
+        """Return extracted data for `url`, from the store when possible.
+
+        `extract` turns a 200 response into JSON-serializable data (or None to
+        skip storing). `kind` namespaces entries so different extractors of the
+        same page don't collide. Returns None for non-200 responses.
+        """
+        key = (kind, canonical_url(url))
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters['coalesced'] += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(key, url, extract, headers, timeout, before_request))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self._counters['errors'] += 1
+
+    async def _fetch(self, key, url, extract, headers, timeout, before_request) -> Optional[Any]:
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            data, result = await self._lookup(key, url, extract, headers, timeout, before_request)
+            return data
+        finally:
+            FETCH_DURATION.observe(time.perf_counter() - started, kind=key[0], result=result)
+
+    async def _lookup(self, key, url, extract, headers, timeout, before_request) -> Tuple[Optional[Any], str]:
+        kind, canonical = key
+        record = await asyncio.to_thread(self._read, kind, canonical)
+        if record and time.time() - record['validated_at'] < self.fresh_for:
+            self._counters['fresh_hits'] += 1
+            return record['data'], 'fresh'
+
+        request_headers = dict(headers or {})
+        if record:
+            if record['etag']:
+                request_headers['If-None-Match'] = record['etag']
+            if record['last_modified']:
+                request_headers['If-Modified-Since'] = record['last_modified']
+
+        if before_request:
+            await before_request()
+
+        session = await http_client.get_session()
+        async with session.get(url, headers=request_headers, timeout=timeout or http_client.timeout('scrape')) as response:
+            if response.status == 304 and record:
+                self._counters['revalidated'] += 1
+                await asyncio.to_thread(self._touch, kind, canonical)
+                return record['data'], 'revalidated'
+            if response.status != 200:
+                return None, str(response.status)
+
+            data = await extract(response)
+            self._counters['fetched'] += 1
+            FETCH_BYTES.observe(response.content.total_bytes, kind=kind)
+            if data is not None:
+                await asyncio.to_thread(
+                    self._write, kind, canonical, data,
+                    response.headers.get('ETag'), response.headers.get('Last-Modified')
+                )
+            return data, 'fetched'
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': str(self.path),
+            'fresh_for': self.fresh_for,
+            'inflight': len(self._inflight),
+            **self._counters,
+        }
+
+page_store = PageStore()
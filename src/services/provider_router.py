@@ -0,0 +1,216 @@
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+import asyncio
+import os
+
+class ProviderStats:
+    """Rolling time-to-first-token and error statistics for one LLM provider"""
+
+    def __init__(self, window: int = 50):
+        self._outcomes: Deque[Tuple[bool, Optional[float]]] = deque(maxlen=window)
+        self.in_flight = 0
+        self.wins = 0
+        self.cancelled = 0
+
+    def record_success(self, ttft: float) -> None:
+        self._outcomes.append((True, ttft))
+
+    def record_error(self) -> None:
+        self._outcomes.append((False, None))
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    def ttft_percentile(self, percentile: float) -> Optional[float]:
+        samples = sorted(ttft for ok, ttft in self._outcomes if ok)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(percentile / 100 * len(samples)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.ttft_percentile(50)
+        p95 = self.ttft_percentile(95)
+        return {
+            'samples': len(self._outcomes),
+            'error_rate': round(self.error_rate, 4),
+            'ttft_p50': round(p50, 4) if p50 is not None else None,
+            'ttft_p95': round(p95, 4) if p95 is not None else None,
+            'in_flight': self.in_flight,
+            'wins': self.wins,
+            'cancelled': self.cancelled,
+        }
+
+class ProviderRouter:
+    """Routes a chat stream to one of several LLM providers.
+
+    Modes (ROUTER_MODE):
+      single   - only the requested provider, as before
+      failover - try the next-best provider if one fails before its first token
+      hedge    - failover, plus start a secondary provider when the primary has
+                 not produced a token within ROUTER_TTFT_THRESHOLD seconds; the
+                 first provider to stream wins and the other is cancelled
+
+    Providers are ranked from the rolling stats the router keeps itself: the
+    requested provider goes first unless its recent error rate is above
+    ROUTER_MAX_ERROR_RATE, the rest by error rate and median TTFT.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, Callable[[List[Any]], AsyncGenerator]],
+        available: Optional[Callable[[str], bool]] = None,
+        mode: Optional[str] = None,
+        ttft_threshold: Optional[float] = None,
+        max_hedges: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        min_samples: int = 5
+    ):
+        self.providers = providers
+        self.available = available or (lambda name: True)
+        self.mode = mode or os.getenv('ROUTER_MODE', 'failover')
+        self.ttft_threshold = ttft_threshold if ttft_threshold is not None else float(os.getenv('ROUTER_TTFT_THRESHOLD', '2.5'))
+        self.max_hedges = max_hedges if max_hedges is not None else int(os.getenv('ROUTER_MAX_HEDGES', '1'))
+        self.max_error_rate = max_error_rate if max_error_rate is not None else float(os.getenv('ROUTER_MAX_ERROR_RATE', '0.5'))
+        self.min_samples = min_samples
+        self.stats = {name: ProviderStats() for name in providers}
+
+    def _healthy(self, name: str) -> bool:
+        stats = self.stats[name]
+        return stats.snapshot()['samples'] < self.min_samples or stats.error_rate <= self.max_error_rate
+
+    def rank(self, preferred: str) -> List[str]:
+        """Order in which providers should be tried for a request that asked for `preferred`"""
+        if self.mode == 'single':
+            return [preferred]
+
+        def score(name: str):
+            p50 = self.stats[name].ttft_percentile(50)
+            return (not self._healthy(name), self.stats[name].error_rate, p50 if p50 is not None else float('inf'))
+
+        others = sorted((n for n in self.providers if n != preferred and self.available(n)), key=score)
+        if self._healthy(preferred) or not others:
+            return [preferred] + others
+        # The requested provider is failing right now; keep it only as a last resort
+        return others + [preferred]
+
+    async def stream(
+        self,
+        preferred: str,
+        messages: List[Any],
+        on_serve: Optional[Callable[[str], None]] = None
+    ) -> AsyncGenerator:
+        """Stream the answer of the first provider to produce a token.
+
+        `on_serve` is called with the winning provider's name before its
+        first chunk, which may not be `preferred` after a failover or hedge.
+        """
+        loop = asyncio.get_running_loop()
+        queue = self.rank(preferred)
+        pending: Dict[asyncio.Future, Tuple[str, AsyncGenerator, float]] = {}
+        winner = None
+        last_error: Optional[BaseException] = None
+        client_error: Optional[HTTPException] = None
+        hedges = 0
+
+        def launch() -> None:
+            name = queue.pop(0)
+            generator = self.providers[name](messages)
+            self.stats[name].in_flight += 1
+            pending[asyncio.ensure_future(generator.__anext__())] = (name, generator, loop.time())
+
+        async def discard(name: str, generator: AsyncGenerator) -> None:
+            self.stats[name].in_flight -= 1
+            await generator.aclose()
+
+        launch()
+        try:
+            while pending and winner is None:
+                can_hedge = self.mode == 'hedge' and queue and hedges < self.max_hedges and client_error is None
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.ttft_threshold if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slow to produce its first token: hedge
+                    hedges += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    name, generator, started = pending.pop(task)
+                    try:
+                        first = task.result()
+                    except HTTPException as e:
+                        if e.status_code < 500:
+                            # Client-side problems (bad request, safety block) are not retried
+                            # elsewhere, but a provider that is already running may still answer
+                            client_error = e
+                            await discard(name, generator)
+                            continue
+                        last_error = e
+                    except StopAsyncIteration:
+                        last_error = HTTPException(status_code=502, detail=f"{name} returned an empty response")
+                    except Exception as e:
+                        last_error = e
+                    else:
+                        if winner is None:
+                            self.stats[name].wins += 1
+                            winner = (name, generator, first, loop.time() - started)
+                        else:
+                            await discard(name, generator)
+                        continue
+
+                    print(f"Provider {name} failed before first token: {last_error}")
+                    self.stats[name].record_error()
+                    await discard(name, generator)
+
+                if winner is None and not pending and queue and client_error is None:
+                    launch()
+        except BaseException:
+            if winner is not None:
+                await discard(winner[0], winner[1])
+            raise
+        finally:
+            # Cancel whichever providers lost the race (or are left after an error)
+            for task, (name, generator, _) in pending.items():
+                task.cancel()
+                self.stats[name].cancelled += 1
+            await asyncio.gather(*pending, return_exceptions=True)
+            for name, generator, _ in pending.values():
+                await discard(name, generator)
+
+        if winner is None:
+            raise client_error or last_error or HTTPException(status_code=502, detail="No provider available")
+
+        name, generator, first, ttft = winner
+        failed = False
+        try:
+            if on_serve is not None:
+                on_serve(name)
+            yield first
+            async for chunk in generator:
+                yield chunk
+        except Exception:
+            failed = True
+            self.stats[name].record_error()
+            raise
+        finally:
+            # Recorded once the stream is over, so a stream that fails midway counts only as an error
+            if not failed:
+                self.stats[name].record_success(ttft)
+            await discard(name, generator)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'ttft_threshold': self.ttft_threshold,
+            'providers': {
+                name: {'available': self.available(name), **stats.snapshot()}
+                for name, stats in self.stats.items()
+            },
+        }
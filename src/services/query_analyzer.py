@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+import os
 import re
 
 class QueryAnalysis(BaseModel):
@@ -8,72 +10,137 @@ class QueryAnalysis(BaseModel):
     confidence: float = Field(ge=0.0, le=1.0)
     reasoning: str
 
+# Keywords that suggest factual or current information is needed
+SEARCH_TRIGGERS: Dict[str, float] = {
+    'statistics': 0.9,
+    'latest': 0.9,
+    'current': 0.9,
+    'recent': 0.9,
+    'trends': 0.9,
+    'news': 0.9,
+    'data': 0.8,
+    'research': 0.8,
+    'study': 0.8,
+    'example': 0.7,
+    'competitor': 0.8,
+    'competitors': 0.8,
+    'business': 0.7,
+    'website': 0.7,
+    'company': 0.7,
+    'companies': 0.7,
+    'market': 0.7,
+    'industry': 0.7,
+}
+
+# Patterns that suggest search might be needed: words that must appear in this order
+SEARCH_PATTERNS: List[Tuple[Tuple[str, ...], float]] = [
+    (('what', 'is|are', 'the (?:best|top|most)'), 0.8),  # "What are the best SEO practices"
+    (('how', 'does|do', 'company|competitor|business'), 0.8),  # "How does Company X do their SEO"
+    (('find|show|give', 'example'), 0.7),  # "Give me examples of"
+    (('compare', 'with|to'), 0.8),  # "Compare X with Y"
+    ((r'(?:in|for)\s+\d{4}',), 0.9),  # References to specific years
+    (('latest|current|recent', 'trend|development|change'), 0.9),  # Latest trends/developments
+]
+
+STOP_WORDS = frozenset({'what', 'is', 'are', 'the', 'in', 'on', 'at', 'for', 'to', 'of', 'and', 'or'})
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv('QUERY_ANALYSIS_CACHE_SIZE', '1024'))
+
+def _compile_part(part: str) -> Pattern:
+    # Whole words, plus plurals ("examples", "businesses")
+    return re.compile(rf'\b(?:{part})(?:s|es)?\b')
+
+def _matches_in_order(parts: Sequence[Pattern], text: str) -> bool:
+    """Whether each part occurs after the previous one.
+
+    Taking the earliest match of every part is enough to decide this, so
+    the scan is linear, unlike a single regex joined with `.*` that
+    backtracks over every earlier occurrence.
+    """
+    position = 0
+    for part in parts:
+        match = part.search(text, position)
+        if match is None:
+            return False
+        position = match.end()
+    return True
+
 class QueryAnalyzer:
-    def __init__(self):
-        # Keywords that suggest factual or current information is needed
-        self.search_triggers = {
-            'statistics': 0.9,
-            'latest': 0.9,
-            'current': 0.9,
-            'recent': 0.9,
-            'trends': 0.9,
-            'news': 0.9,
-            'data': 0.8,
-            'research': 0.8,
-            'study': 0.8,
-            'example': 0.7,
-            'competitor': 0.8,
-            'competitors': 0.8,
-            'business': 0.7,
-            'website': 0.7,
-            'company': 0.7,
-            'companies': 0.7,
-            'market': 0.7,
-            'industry': 0.7,
-        }
-        
-        # Patterns that suggest search might be needed
-        self.search_patterns = [
-            (r'what.*(?:is|are).*(?:the best|the top|the most)', 0.8),  # "What are the best SEO practices"
-            (r'how.*(?:does|do).*(?:company|competitor|business)', 0.8),  # "How does Company X do their SEO"
-            (r'(?:find|show|give).*example', 0.7),  # "Give me examples of"
-            (r'compare.*(?:with|to)', 0.8),  # "Compare X with Y"
-            (r'(?:in|for)\s+\d{4}', 0.9),  # References to specific years
-            (r'(?:latest|current|recent).*(?:trend|development|change)', 0.9),  # Latest trends/developments
+    """Decides from keywords and phrasing whether a chat message needs a web search.
+
+    Triggers and patterns match whole words (plurals included), so "data"
+    no longer fires on "update". Results are memoized per normalized query
+    in an LRU of QUERY_ANALYSIS_CACHE_SIZE entries.
+    """
+
+    def __init__(self, cache_size: int = QUERY_ANALYSIS_CACHE_SIZE):
+        self.search_triggers = dict(SEARCH_TRIGGERS)
+        self.search_patterns = list(SEARCH_PATTERNS)
+
+        # One dict lookup per word of the query, whatever the number of triggers
+        self._trigger_words: Dict[str, str] = {trigger: trigger for trigger in self.search_triggers}
+        for trigger in self.search_triggers:
+            self._trigger_words.setdefault(trigger + 's', trigger)
+            self._trigger_words.setdefault(trigger + 'es', trigger)
+        self._patterns = [
+            (tuple(_compile_part(part) for part in parts), confidence)
+            for parts, confidence in self.search_patterns
         ]
+        self._cached_analyze = lru_cache(maxsize=cache_size)(self._analyze)
 
     def analyze(self, query: str) -> QueryAnalysis:
-        query_lower = query.lower()
+        # Callers get their own copy so the cached result is never mutated
+        return self._cached_analyze(' '.join(query.lower().split())).model_copy()
+
+    def analyze_many(self, queries: Iterable[str]) -> List[QueryAnalysis]:
+        """Analyze a batch of queries; repeats within the batch are analyzed once"""
+        results: Dict[str, QueryAnalysis] = {}
+        analyses = []
+        for query in queries:
+            key = ' '.join(query.lower().split())
+            analysis = results.get(key)
+            if analysis is None:
+                analysis = results[key] = self._cached_analyze(key)
+            analyses.append(analysis.model_copy())
+        return analyses
+
+    def cache_info(self):
+        return self._cached_analyze.cache_info()
+
+    def _analyze(self, query_lower: str) -> QueryAnalysis:
         max_confidence = 0.0
         reasons = []
-        
+
         # Check for trigger words
+        words = set(_WORD.findall(query_lower))
+        found = {self._trigger_words[word] for word in words if word in self._trigger_words}
         for trigger, confidence in self.search_triggers.items():
-            if trigger in query_lower:
+            if trigger in found:
                 max_confidence = max(max_confidence, confidence)
                 reasons.append(f"Contains keyword '{trigger}'")
-        
+
         # Check for patterns
-        for pattern, confidence in self.search_patterns:
-            if re.search(pattern, query_lower):
+        for parts, confidence in self._patterns:
+            if _matches_in_order(parts, query_lower):
                 max_confidence = max(max_confidence, confidence)
                 reasons.append(f"Matches pattern for specific information request")
-        
+
         # Determine if search is needed based on confidence threshold
         needs_search = max_confidence >= 0.7
-        
+
         # Create search query if needed
         search_query = None
         if needs_search:
             # Extract key terms for search
             # Remove common words and create focused search query
-            stop_words = {'what', 'is', 'are', 'the', 'in', 'on', 'at', 'for', 'to', 'of', 'and', 'or'}
-            terms = [word for word in query_lower.split() if word not in stop_words]
+            terms = [word for word in query_lower.split() if word not in STOP_WORDS]
             search_query = ' '.join(terms) + ' Las Vegas SEO'  # Add domain context
-        
+
         return QueryAnalysis(
             needs_search=needs_search,
             search_query=search_query,
             confidence=max_confidence,
             reasoning='; '.join(reasons) if reasons else "No search triggers found"
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,190 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parents[2] / '.cache' / 'rate_limits.sqlite3'
+
+# Every this many reservations a store drops buckets whose slots have all
+# come free again (tat in the past): they behave exactly like absent ones
+PRUNE_EVERY = 256
+
+class RateLimitExceeded(Exception):
+    """Raised when the next free slot is further away than the caller is willing to wait"""
+
+class MemoryStore:
+    """Bucket state for this process only"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._tat: Dict[str, float] = {}
+        self._reserves = 0
+
+    def prune(self, now: float) -> None:
+        self._tat = {key: tat for key, tat in self._tat.items() if tat > now}
+
+    def reserve(self, key: str, interval: float, tolerance: float, max_wait: Optional[float]) -> Optional[float]:
+        now = time.monotonic()
+        self._reserves += 1
+        if self._reserves % PRUNE_EVERY == 0:
+            self.prune(now)
+        tat = max(self._tat.get(key, now), now)
+        wait = max(0.0, tat - tolerance - now)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self._tat[key] = tat + interval
+        return wait
+
+class SqliteStore:
+    """Bucket state in a local SQLite file, shared by every worker process on the host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._reserves = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL)')
+            self._db = db
+        return self._db
+
+    def reserve(self, key: str, interval: float, tolerance: float, max_wait: Optional[float]) -> Optional[float]:
+        with self._lock:
+            db = self._connect()
+            # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                self._reserves += 1
+                if self._reserves % PRUNE_EVERY == 0:
+                    db.execute('DELETE FROM buckets WHERE tat <= ?', (now,))
+                row = db.execute('SELECT tat FROM buckets WHERE key = ?', (key,)).fetchone()
+                tat = max(row[0], now) if row else now
+                wait = max(0.0, tat - tolerance - now)
+                if max_wait is not None and wait > max_wait:
+                    db.execute('ROLLBACK')
+                    return None
+                db.execute('INSERT OR REPLACE INTO buckets (key, tat) VALUES (?, ?)', (key, tat + interval))
+                db.execute('COMMIT')
+                return wait
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+_store = None
+
+def get_store():
+    """RATE_LIMIT_STORE: a SQLite path (default .cache/rate_limits.sqlite3) or 'memory'"""
+    global _store
+    if _store is None:
+        setting = os.getenv('RATE_LIMIT_STORE', '')
+        _store = MemoryStore() if setting == 'memory' else SqliteStore(Path(setting or DEFAULT_STORE_PATH))
+    return _store
+
+def close_store() -> None:
+    if isinstance(_store, SqliteStore):
+        _store.close()
+
+def _fall_back_to_memory(error: Exception) -> MemoryStore:
+    global _store
+    print(f"Rate limit store unavailable ({error}), limiting per process")
+    _store = MemoryStore()
+    return _store
+
+class TokenBucketLimiter:
+    """Async token bucket: `rate` requests per second with bursts of up to `burst`.
+
+    Implemented as GCRA: each acquire atomically reserves the next free slot
+    and then sleeps until it, so concurrent callers queue up instead of all
+    reading the same "last request" time and firing together. Rate and burst
+    come from {NAME}_RATE_LIMIT and {NAME}_RATE_BURST unless given; keys give
+    independent buckets (e.g. one per host).
+    """
+
+    def __init__(self, name: str, rate: Optional[float] = None, burst: Optional[int] = None,
+                 default_rate: float = 1.0, default_burst: int = 1):
+        self.name = name
+        self._rate = rate
+        self._burst = burst
+        self._default_rate = default_rate
+        self._default_burst = default_burst
+        self._counters: Dict[str, float] = {'acquired': 0, 'delayed': 0, 'rejected': 0, 'wait_seconds': 0.0}
+
+    # Resolved lazily so a .env loaded after import is still honored
+    @property
+    def rate(self) -> float:
+        if self._rate is None:
+            self._rate = float(os.getenv(f'{self.name.upper()}_RATE_LIMIT', str(self._default_rate)))
+        return self._rate
+
+    @property
+    def burst(self) -> int:
+        if self._burst is None:
+            self._burst = int(os.getenv(f'{self.name.upper()}_RATE_BURST', str(self._default_burst)))
+        return self._burst
+
+    async def acquire(self, key: str = '', max_wait: Optional[float] = None) -> float:
+        """Wait for a slot; returns the seconds waited, or raises RateLimitExceeded past `max_wait`"""
+        if self.rate <= 0:
+            return 0.0
+        interval = 1.0 / self.rate
+        tolerance = (max(1, self.burst) - 1) * interval
+        bucket = f'{self.name}:{key}'
+
+        store = get_store()
+        if isinstance(store, MemoryStore):
+            wait = store.reserve(bucket, interval, tolerance, max_wait)
+        else:
+            try:
+                wait = await asyncio.to_thread(store.reserve, bucket, interval, tolerance, max_wait)
+            except sqlite3.Error as e:
+                wait = _fall_back_to_memory(e).reserve(bucket, interval, tolerance, max_wait)
+
+        if wait is None:
+            self._counters['rejected'] += 1
+            raise RateLimitExceeded(f"{self.name} rate limit: no slot within {max_wait:.2f}s")
+        self._counters['acquired'] += 1
+        if wait > 0:
+            self._counters['delayed'] += 1
+            self._counters['wait_seconds'] += wait
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'store': get_store().name,
+            **{name: round(value, 3) for name, value in self._counters.items()},
+        }
+
+def host_key(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower()
+
+# Brave's plan limit is per subscription token, so one bucket for all searches.
+# Hedged fallback queries (api_server.hedged_search) draw from it too, but
+# only take a slot that is free right now and never wait for one: under
+# load hedges are skipped instead of using up the slots other searches
+# are queued for
+brave_limiter = TokenBucketLimiter('brave', default_rate=1.0, default_burst=1)
+
+# Politeness towards scraped sites: one bucket per host
+scrape_limiter = TokenBucketLimiter('scrape', default_rate=2.0, default_burst=2)
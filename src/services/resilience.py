@@ -0,0 +1,232 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import os
+import random
+import time
+
+import aiohttp
+
+# Worth retrying: throttling and transient server/gateway failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, retrying in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open, calls fail fast. After `recovery_timeout` seconds one probe is
+    let through (half-open): success closes the breaker, failure re-opens it
+    for another timeout.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == 'open' and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = 'half_open'
+        return self._state
+
+    def retry_in(self) -> float:
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open only the single probe may"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._state = 'closed'
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == 'half_open' or self._failures >= self.failure_threshold:
+            if self._state != 'open':
+                self.opened += 1
+            self._state = 'open'
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give up a probe without a verdict (e.g. the caller was cancelled)"""
+        self._probing = False
+
+class RetryBudget:
+    """Caps retries at `ratio` of requests, so retries cannot multiply load during an outage.
+
+    Every request deposits `ratio` tokens, every retry spends one; the
+    balance starts at and is capped by `max_tokens`.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class Upstream:
+    """Retry policy, retry budget and circuit breaker for one upstream service.
+
+    Settings come from UPSTREAM_* environment variables, optionally
+    overridden per upstream as {NAME}_UPSTREAM_* (e.g. BRAVE_UPSTREAM_ATTEMPTS):
+      ATTEMPTS           tries per call, including the first (3)
+      BASE_DELAY         backoff base in seconds (0.5)
+      MAX_DELAY          longest backoff or Retry-After to wait (8)
+      RETRY_BUDGET       retries allowed per request, on average (0.2)
+      BREAKER_THRESHOLD  consecutive failures that open the breaker (5)
+      BREAKER_TIMEOUT    seconds open before a recovery probe (30)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attempts = int(self._setting('ATTEMPTS', '3'))
+        self.base_delay = float(self._setting('BASE_DELAY', '0.5'))
+        self.max_delay = float(self._setting('MAX_DELAY', '8'))
+        self.budget = RetryBudget(float(self._setting('RETRY_BUDGET', '0.2')), max_tokens=10)
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(self._setting('BREAKER_THRESHOLD', '5')),
+            recovery_timeout=float(self._setting('BREAKER_TIMEOUT', '30'))
+        )
+        self._counters = {'requests': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'budget_exhausted': 0}
+
+    def _setting(self, key: str, default: str) -> str:
+        return os.getenv(f'{self.name.upper()}_UPSTREAM_{key}') or os.getenv(f'UPSTREAM_{key}', default)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (0-based): Retry-After if given, else full jitter"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def request(
+        self,
+        send: Callable[[], Awaitable[aiohttp.ClientResponse]],
+        deadline: Optional[float] = None
+    ) -> aiohttp.ClientResponse:
+        """Send a request, retrying throttling, 5xx and connection errors.
+
+        `send` issues one attempt and returns the un-entered response. Any
+        response that is not retried (success, client error, or the last
+        failure) is returned for the caller to handle and release; errors
+        from the last attempt propagate. `deadline` (loop time) bounds the
+        total time spent waiting between attempts. Raises CircuitOpenError
+        without calling `send` while the breaker is open.
+        """
+        if not self.breaker.allow():
+            self._counters['rejected'] += 1
+            raise CircuitOpenError(self.name, self.breaker.retry_in())
+        self._counters['requests'] += 1
+        self.budget.deposit()
+
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            response = None
+            retry_after = None
+            try:
+                response = await send()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if response.status not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                error = None
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            self._counters['failures'] += 1
+            self.breaker.record_failure()
+            delay = self.backoff(attempt, retry_after)
+            attempt += 1
+            retry = (
+                attempt < self.attempts
+                and delay <= self.max_delay
+                and (deadline is None or loop.time() + delay < deadline)
+                and self.breaker.allow()
+            )
+            if retry and not self.budget.try_spend():
+                self._counters['budget_exhausted'] += 1
+                retry = False
+            if not retry:
+                if error is not None:
+                    raise error
+                return response
+
+            described = response.status if response is not None else type(error).__name__
+            print(f"{self.name} request failed ({described}), retry {attempt}/{self.attempts - 1} in {delay:.2f}s")
+            if response is not None:
+                response.release()
+            self._counters['retries'] += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.breaker.state
+        return {
+            'state': state,
+            'consecutive_failures': self.breaker._failures,
+            'retry_in': round(self.breaker.retry_in(), 2) if state == 'open' else 0.0,
+            'times_opened': self.breaker.opened,
+            'retry_tokens': round(self.budget.tokens, 2),
+            **self._counters,
+        }
+
+class UpstreamRegistry:
+    """One Upstream per name, created on first use so a .env loaded after import is honored"""
+
+    def __init__(self):
+        self._upstreams: Dict[str, Upstream] = {}
+
+    def get(self, name: str) -> Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            upstream = self._upstreams[name] = Upstream(name)
+        return upstream
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: upstream.stats() for name, upstream in self._upstreams.items()}
+
+upstreams = UpstreamRegistry()
@@ -0,0 +1,400 @@
+from collections import Counter
+from math import log
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from .context_builder import BM25_B, BM25_K1, terms
+from .page_store import canonical_url
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_INDEX_PATH = ROOT / '.cache' / 'search_index.sqlite3'
+DEFAULT_GHOST_DB = ROOT / 'blog' / 'content' / 'data' / 'ghost-dev.db'
+
+# Indexed text per document; matches what the scrapers keep per page
+MAX_CONTENT_CHARS = 5000
+
+class Hit(NamedTuple):
+    url: str
+    title: str
+    snippet: str
+    content: str
+    kind: str
+    score: float
+    coverage: float
+    indexed_at: float
+
+class SearchIndex:
+    """On-disk inverted index over scraped pages and our own Ghost blog posts.
+
+    Documents are keyed by canonical URL and re-indexed only when their text
+    changes. Queries are scored with BM25 over the whole index. `lookup`
+    decides whether the local results are good enough to answer a search
+    without Brave: at least `min_results` documents matching `min_coverage`
+    of the query terms, with web pages indexed within `max_age` seconds
+    (blog posts are ours and never go stale). Blog posts are re-synced in
+    the background at most every `blog_sync_interval` seconds, so lookups
+    only ever read.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ghost_db: Optional[str] = None,
+        blog_url: Optional[str] = None,
+        min_results: Optional[int] = None,
+        min_coverage: Optional[float] = None,
+        max_age: Optional[float] = None,
+        blog_sync_interval: Optional[float] = None
+    ):
+        self._path = path
+        self._ghost_db = ghost_db
+        self._blog_url = blog_url
+        self._min_results = min_results
+        self._min_coverage = min_coverage
+        self._max_age = max_age
+        self._blog_sync_interval = blog_sync_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._blog_mtime: Optional[float] = None
+        self._blog_skipped = False
+        self._blog_checked: Optional[float] = None
+        self._blog_sync: Optional[asyncio.Future] = None
+        # Per-kind document counts, loaded on connect and kept current on writes
+        self._documents: Dict[str, int] = {}
+        self._pending: Set[asyncio.Future] = set()
+        self._counters: Dict[str, int] = {'lookups': 0, 'local_answers': 0, 'fallbacks': 0, 'indexed': 0, 'unchanged': 0}
+
+    # Resolved lazily so a .env loaded after import is still honored
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = os.getenv('SEARCH_INDEX_PATH') or str(DEFAULT_INDEX_PATH)
+        return Path(self._path)
+
+    @property
+    def ghost_db(self) -> Path:
+        if self._ghost_db is None:
+            self._ghost_db = os.getenv('GHOST_DB_PATH') or str(DEFAULT_GHOST_DB)
+        return Path(self._ghost_db)
+
+    @property
+    def blog_url(self) -> str:
+        """Public base URL of the blog (BLOG_URL, else VITE_GHOST_URL), '' when not configured"""
+        if self._blog_url is None:
+            self._blog_url = os.getenv('BLOG_URL') or os.getenv('VITE_GHOST_URL', '')
+        return self._blog_url.rstrip('/') + '/' if self._blog_url else ''
+
+    @property
+    def min_results(self) -> int:
+        if self._min_results is None:
+            self._min_results = int(os.getenv('LOCAL_SEARCH_MIN_RESULTS', '3'))
+        return self._min_results
+
+    @property
+    def min_coverage(self) -> float:
+        if self._min_coverage is None:
+            self._min_coverage = float(os.getenv('LOCAL_SEARCH_MIN_COVERAGE', '0.6'))
+        return self._min_coverage
+
+    @property
+    def max_age(self) -> float:
+        if self._max_age is None:
+            self._max_age = float(os.getenv('LOCAL_SEARCH_MAX_AGE', '604800'))
+        return self._max_age
+
+    @property
+    def blog_sync_interval(self) -> float:
+        if self._blog_sync_interval is None:
+            self._blog_sync_interval = float(os.getenv('BLOG_SYNC_INTERVAL', '300'))
+        return self._blog_sync_interval
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5.0)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' id INTEGER PRIMARY KEY,'
+                ' url TEXT NOT NULL UNIQUE,'
+                ' kind TEXT NOT NULL,'
+                ' title TEXT NOT NULL,'
+                ' snippet TEXT NOT NULL,'
+                ' content TEXT NOT NULL,'
+                ' digest TEXT NOT NULL,'
+                ' length INTEGER NOT NULL,'
+                ' indexed_at REAL NOT NULL)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS postings ('
+                ' term TEXT NOT NULL,'
+                ' doc_id INTEGER NOT NULL,'
+                ' tf INTEGER NOT NULL,'
+                ' PRIMARY KEY (term, doc_id)) WITHOUT ROWID'
+            )
+            db.execute('CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id)')
+            db.commit()
+            self._documents = dict(db.execute('SELECT kind, COUNT(*) FROM documents GROUP BY kind').fetchall())
+            self._db = db
+        return self._db
+
+    def _upsert(self, db: sqlite3.Connection, url: str, kind: str, title: str, snippet: str, content: str) -> None:
+        content = content[:MAX_CONTENT_CHARS]
+        digest = hashlib.sha1(f'{title}\n{snippet}\n{content}'.encode('utf-8')).hexdigest()
+        now = time.time()
+        row = db.execute("SELECT id, digest, kind, content != '' FROM documents WHERE url = ?", (url,)).fetchone()
+        if row and not content.strip() and row[3]:
+            # Never trade a page's text for its snippet alone
+            return
+        if row and row[1] == digest:
+            # Unchanged: only refresh its age
+            db.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (now, row[0]))
+            self._counters['unchanged'] += 1
+            return
+
+        # Titles count twice: they say what a page is about
+        counts = Counter(terms(title) * 2 + terms(snippet) + terms(content))
+        length = sum(counts.values())
+        if row:
+            doc_id = row[0]
+            db.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+            db.execute(
+                'UPDATE documents SET kind = ?, title = ?, snippet = ?, content = ?, digest = ?, length = ?, indexed_at = ?'
+                ' WHERE id = ?',
+                (kind, title, snippet, content, digest, length, now, doc_id)
+            )
+            self._count(row[2], -1)
+        else:
+            doc_id = db.execute(
+                'INSERT INTO documents (url, kind, title, snippet, content, digest, length, indexed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, kind, title, snippet, content, digest, length, now)
+            ).lastrowid
+        self._count(kind, 1)
+        db.executemany(
+            'INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)',
+            [(term, doc_id, tf) for term, tf in counts.items()]
+        )
+        self._counters['indexed'] += 1
+
+    def add(self, url: str, title: str, content: str = '', snippet: str = '', kind: str = 'web') -> None:
+        """Index (or re-index) one document; a no-op apart from its age if the text is unchanged.
+
+        Pages without content (scrape timed out or failed) are skipped: a
+        snippet alone must never make a lookup look sufficient.
+        """
+        if not (content and content.strip()):
+            return
+        with self._lock:
+            db = self._connect()
+            self._upsert(db, canonical_url(url), kind, title or url, snippet or '', content or '')
+            db.commit()
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            db = self._connect()
+            self._delete(db, canonical_url(url))
+            db.commit()
+
+    def _delete(self, db: sqlite3.Connection, url: str) -> None:
+        row = db.execute('SELECT id, kind FROM documents WHERE url = ?', (url,)).fetchone()
+        if row:
+            db.execute('DELETE FROM postings WHERE doc_id = ?', (row[0],))
+            db.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+            self._count(row[1], -1)
+
+    def _count(self, kind: str, delta: int) -> None:
+        # Replaced, not mutated, so stats() can copy it without the lock
+        documents = dict(self._documents)
+        documents[kind] = documents.get(kind, 0) + delta
+        if documents[kind] <= 0:
+            del documents[kind]
+        self._documents = documents
+
+    def prune(self, older_than: float) -> int:
+        """Drop web pages not seen again within `older_than` seconds"""
+        with self._lock:
+            db = self._connect()
+            ids = [row[0] for row in db.execute(
+                "SELECT id FROM documents WHERE kind = 'web' AND indexed_at < ?", (time.time() - older_than,)
+            )]
+            db.executemany('DELETE FROM postings WHERE doc_id = ?', [(doc_id,) for doc_id in ids])
+            db.executemany('DELETE FROM documents WHERE id = ?', [(doc_id,) for doc_id in ids])
+            db.commit()
+            if ids:
+                self._count('web', -len(ids))
+        return len(ids)
+
+    def sync_blog(self) -> int:
+        """Bring published Ghost posts and pages into the index; returns how many were (re)indexed.
+
+        Reads Ghost's SQLite database read-only and skips the work entirely
+        while the file is unchanged since the last sync. Posts are linked
+        under `blog_url`; without one nothing is indexed (and posts indexed
+        earlier are dropped), since these URLs are shown to the model.
+        """
+        self._blog_checked = time.monotonic()
+        base = self.blog_url
+        if not base:
+            if not self._blog_skipped:
+                print("BLOG_URL is not set, blog posts are not indexed")
+                with self._lock:
+                    db = self._connect()
+                    for (url,) in db.execute("SELECT url FROM documents WHERE kind = 'blog'").fetchall():
+                        self._delete(db, url)
+                    db.commit()
+                self._blog_skipped = True
+            return 0
+
+        path = self.ghost_db
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return 0
+        if mtime == self._blog_mtime:
+            return 0
+
+        ghost = None
+        try:
+            ghost = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            rows = ghost.execute(
+                "SELECT slug, title, custom_excerpt, plaintext FROM posts"
+                " WHERE status = 'published' AND visibility = 'public'"
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Could not read Ghost posts from {path}: {e}")
+            return 0
+        finally:
+            if ghost is not None:
+                ghost.close()
+
+        indexed = self._counters['indexed']
+        with self._lock:
+            db = self._connect()
+            published = set()
+            for slug, title, excerpt, plaintext in rows:
+                url = canonical_url(f'{base}{slug}/')
+                published.add(url)
+                text = plaintext or ''
+                self._upsert(db, url, 'blog', title, excerpt or text[:200], text)
+            for (url,) in db.execute("SELECT url FROM documents WHERE kind = 'blog'").fetchall():
+                if url not in published:
+                    self._delete(db, url)
+            db.commit()
+        self._blog_mtime = mtime
+        return self._counters['indexed'] - indexed
+
+    def search(self, query: str, limit: int = 5) -> List[Hit]:
+        """Top `limit` documents for `query` by BM25"""
+        query_terms = sorted(set(terms(query)))
+        if not query_terms:
+            return []
+        with self._lock:
+            db = self._connect()
+            documents, total_length = db.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents').fetchone()
+            if not documents:
+                return []
+            postings: Dict[str, List[Tuple[int, int, int]]] = {
+                term: db.execute(
+                    'SELECT p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id WHERE p.term = ?',
+                    (term,)
+                ).fetchall()
+                for term in query_terms
+            }
+
+            average_length = total_length / documents or 1.0
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for entries in postings.values():
+                idf = log(1 + (documents - len(entries) + 0.5) / (len(entries) + 0.5))
+                for doc_id, tf, length in entries:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+            hits = []
+            for doc_id in sorted(scores, key=scores.get, reverse=True)[:limit]:
+                url, title, snippet, content, kind, indexed_at = db.execute(
+                    'SELECT url, title, snippet, content, kind, indexed_at FROM documents WHERE id = ?', (doc_id,)
+                ).fetchone()
+                hits.append(Hit(
+                    url=url,
+                    title=title,
+                    snippet=snippet,
+                    content=content,
+                    kind=kind,
+                    score=round(scores[doc_id], 4),
+                    coverage=round(matched[doc_id] / len(query_terms), 4),
+                    indexed_at=indexed_at,
+                ))
+        return hits
+
+    def _lookup(self, query: str, limit: int) -> Tuple[List[Hit], bool]:
+        hits = self.search(query, limit)
+        now = time.time()
+        good = [
+            hit for hit in hits
+            if hit.coverage >= self.min_coverage and (hit.kind == 'blog' or now - hit.indexed_at < self.max_age)
+        ]
+        return hits, len(good) >= self.min_results
+
+    async def lookup(self, query: str, limit: int = 5) -> Tuple[List[Hit], bool]:
+        """Local hits for `query` and whether they are enough to skip a web search"""
+        self.sync_blog_later()
+        hits, sufficient = await asyncio.to_thread(self._lookup, query, limit)
+        self._counters['lookups'] += 1
+        self._counters['local_answers' if sufficient else 'fallbacks'] += 1
+        return hits, sufficient
+
+    def sync_blog_later(self) -> None:
+        """Start a background `sync_blog` if the last one is older than `blog_sync_interval`"""
+        if self._blog_sync is not None:
+            return
+        if self._blog_checked is not None and time.monotonic() - self._blog_checked < self.blog_sync_interval:
+            return
+        task = asyncio.ensure_future(asyncio.to_thread(self.sync_blog))
+        self._blog_sync = task
+        self._pending.add(task)
+        task.add_done_callback(self._blog_synced)
+
+    def _blog_synced(self, task: asyncio.Future) -> None:
+        self._blog_sync = None
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Blog sync failed: {task.exception()}")
+
+    def _add_all(self, documents: Sequence[Any]) -> None:
+        for document in documents:
+            self.add(document.url, document.title, document.content or '', getattr(document, 'snippet', None) or '')
+
+    def add_later(self, documents: Sequence[Any]) -> None:
+        """Index objects with url/title/content (and optionally snippet) in a thread, off the request path"""
+        task = asyncio.ensure_future(asyncio.to_thread(self._add_all, list(documents)))
+        self._pending.add(task)
+        task.add_done_callback(self._indexed)
+
+    def _indexed(self, task: asyncio.Future) -> None:
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Search index update failed: {task.exception()}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters only, never touches SQLite: safe to call on the event loop"""
+        return {
+            'path': str(self.path),
+            'documents': dict(self._documents),
+            **self._counters,
+        }
+
+search_index = SearchIndex()
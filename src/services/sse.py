@@ -0,0 +1,93 @@
+from typing import Any, AsyncIterator, List
+import json
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    orjson = None
+
+    def loads(data):
+        return json.loads(data)
+
+DONE = b'[DONE]'
+
+class SSEDecoder:
+    """Incremental Server-Sent Events decoder.
+
+    Feed it raw bytes as they arrive; it returns the `data` payload (as bytes)
+    of every event completed by that chunk. Partial lines and events are
+    buffered until the rest arrives, so events split across reads decode
+    correctly. Lines may end in LF, CRLF or a lone CR, as the SSE spec allows.
+    Comment lines (keep-alives) and non-data fields are ignored.
+    """
+
+    __slots__ = ('_buffer', '_data')
+
+    def __init__(self):
+        self._buffer = b''
+        self._data: List[bytes] = []
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        events: List[bytes] = []
+        if self._buffer:
+            chunk = self._buffer + chunk
+        held = b''
+        if b'\r' in chunk:
+            # A trailing CR waits for the next chunk: it may be the first half of a CRLF
+            if chunk[-1:] == b'\r':
+                chunk, held = chunk[:-1], b'\r'
+            chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if b'\n' not in chunk:
+            self._buffer = chunk + held
+            return events
+        lines = chunk.split(b'\n')
+        self._buffer = lines.pop() + held
+        for line in lines:
+            self._process_line(line, events)
+        return events
+
+    def flush(self) -> List[bytes]:
+        """Dispatch whatever is left once the stream has ended"""
+        events: List[bytes] = []
+        if self._buffer:
+            self._process_line(self._buffer, events)
+            self._buffer = b''
+        self._process_line(b'', events)
+        return events
+
+    def _process_line(self, line: bytes, events: List[bytes]) -> None:
+        if line[-1:] == b'\r':
+            line = line[:-1]
+        if not line:
+            # Blank line ends the event
+            data = self._data
+            if data:
+                events.append(data[0] if len(data) == 1 else b'\n'.join(data))
+                self._data = []
+            return
+        if line[:5] == b'data:':
+            value = line[5:]
+            self._data.append(value[1:] if value[:1] == b' ' else value)
+        # Comments (':' keep-alives), event/id/retry fields are ignored
+
+async def iter_sse_events(response) -> AsyncIterator[bytes]:
+    """Yield SSE data payloads from an aiohttp response as soon as each event completes"""
+    decoder = SSEDecoder()
+    async for chunk in response.content.iter_any():
+        for event in decoder.feed(chunk):
+            yield event
+    for event in decoder.flush():
+        yield event
+
+async def iter_sse_json(response) -> AsyncIterator[Any]:
+    """Yield decoded JSON events, stopping at the OpenAI-style [DONE] sentinel"""
+    async for event in iter_sse_events(response):
+        if event == DONE:
+            return
+        try:
+            yield loads(event)
+        except ValueError:
+            print(f"Skipping malformed stream event: {event[:200]!r}")
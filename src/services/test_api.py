@@ -2,6 +2,7 @@ import asyncio
 import json
 from .brave_search import BraveSearchTool
 from .query_analyzer import QueryAnalyzer
+from .http_client import http_client
 
 async def test_search_and_analysis():
     # Test cases with different types of queries
@@ -40,5 +41,11 @@ async def test_search_and_analysis():
         else:
             print("\nNo search needed for this query")
 
+async def main():
+    try:
+        await test_search_and_analysis()
+    finally:
+        await http_client.close()
+
 if __name__ == "__main__":
-    asyncio.run(test_search_and_analysis()) 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file
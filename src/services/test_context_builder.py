@@ -0,0 +1,42 @@
+"""BM25 ranking, deduplication and budgets of pack_context on small fake sources. Run with pytest."""
+import types
+
+import pytest
+
+from src.services.context_builder import bm25_scores, estimate_tokens, pack_context, split_chunks
+
+def source(title, content):
+    return types.SimpleNamespace(title=title, content=content, snippet=None)
+
+SEO = "Local SEO helps Las Vegas businesses rank in map results. Reviews and citations matter for local rankings."
+POKER = "Poker rooms on the Strip run tournaments every night. Blackjack tables open around the clock."
+
+def test_bm25_ranks_matching_chunk_first():
+    chunks = split_chunks(POKER, 0) + split_chunks(SEO, 1)
+    scores = bm25_scores('local seo rankings', chunks)
+    assert scores[1] > scores[0] == 0.0
+
+def test_packs_relevant_source_only():
+    packed = pack_context('local seo rankings', [source('Casino', POKER), source('SEO guide', SEO)], 600)
+    assert packed.text.startswith('From SEO guide:')
+    assert 'Poker' not in packed.text
+    assert packed.chunks_used == 1
+    assert packed.chunks_total == 2
+
+def test_duplicate_passages_are_dropped_and_counted_as_saved():
+    packed = pack_context('local seo', [source('A', SEO), source('B', SEO)], 600)
+    assert packed.chunks_total == 1
+    assert packed.tokens_used == estimate_tokens(SEO)
+    assert packed.tokens_saved == estimate_tokens(SEO)
+
+@pytest.mark.parametrize('budget', [0, 10, 40, 80])
+def test_stays_within_budget(budget):
+    long_text = ' '.join(f"Vegas SEO tip number {i} is about local search ranking." for i in range(60))
+    packed = pack_context('vegas seo ranking', [source('Tips', long_text)], budget)
+    assert packed.tokens_used <= budget
+    assert packed.tokens_used + packed.tokens_saved == packed.tokens_available
+
+def test_ratio_changes_chunk_costs():
+    at_four = pack_context('local seo', [source('A', SEO)], 600)
+    at_three = pack_context('local seo', [source('A', SEO)], 600, ratio=3.0)
+    assert at_three.tokens_used == estimate_tokens(SEO, 3.0) > at_four.tokens_used
@@ -0,0 +1,46 @@
+"""CpuPool recovery after a worker dies, and CPU_POOL_MODE validation. Run with pytest."""
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.services.cpu_pool import CpuPool
+
+def crash() -> None:
+    os._exit(1)
+
+def square(n: int) -> int:
+    return n * n
+
+def test_pool_recovers_after_a_worker_dies(monkeypatch):
+    monkeypatch.setenv('CPU_POOL_MODE', 'process')
+    monkeypatch.setenv('CPU_POOL_WORKERS', '1')
+    monkeypatch.setenv('CPU_POOL_MAX_PENDING', '2')
+    pool = CpuPool()
+
+    async def run():
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(crash)
+        # Let the done callback hand the slot back to the loop
+        await asyncio.sleep(0)
+        return [await pool.run(square, n) for n in range(4)]
+
+    try:
+        assert asyncio.run(run()) == [0, 1, 4, 9]
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert stats['pending'] == 0
+    assert stats['restarts'] == 1
+    assert stats['completed'] == 4
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setenv('CPU_POOL_MODE', 'proces')
+    pool = CpuPool()
+
+    async def run():
+        await pool.run(square, 2)
+
+    with pytest.raises(RuntimeError, match='CPU_POOL_MODE'):
+        asyncio.run(run())
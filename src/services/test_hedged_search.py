@@ -0,0 +1,141 @@
+"""hedged_search against a fake Brave API and scraper. Run with pytest."""
+import asyncio
+from collections import deque
+
+import pytest
+
+from src.services import api_server
+from src.services.api_server import Source, hedged_search
+from src.services.cache import AsyncTTLCache
+
+QUERIES = ['exact', 'seo', 'broad']
+
+@pytest.fixture
+def brave(monkeypatch):
+    """Fake Brave call: per-query (delay, result count); records starts, cancellations and scrapes"""
+    plan = {}
+    started, cancelled, scraped, hedges = [], [], [], []
+
+    async def fetch_brave_results(query, deadline, speculative=False):
+        started.append(query)
+        if speculative:
+            hedges.append(query)
+        delay, count = plan[query]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+        return [Source(title=query, url=f'https://example.com/{query}/{i}') for i in range(count)]
+
+    async def scrape_sources(sources, deadline):
+        if sources:
+            scraped.append(sources[0].title)
+        await asyncio.sleep(fetch_brave_results.scrape_delay)
+        for source in sources:
+            source.content = f'page {source.url}'
+        return sources
+
+    monkeypatch.setattr(api_server, 'fetch_brave_results', fetch_brave_results)
+    monkeypatch.setattr(api_server, 'scrape_sources', scrape_sources)
+    monkeypatch.setattr(api_server.search_index, 'add_later', lambda sources: None)
+    monkeypatch.setattr(api_server, 'search_cache', AsyncTTLCache(
+        should_cache=bool,
+        ttl_for=lambda sources: 60 if any(source.content is None for source in sources) else None
+    ))
+    monkeypatch.setattr(api_server, 'brave_calls', AsyncTTLCache(should_cache=lambda results: False))
+    monkeypatch.setattr(api_server, 'hedge_results', AsyncTTLCache(ttl=60, should_cache=bool))
+    monkeypatch.setattr(api_server, 'SEARCH_HEDGE_DELAY', 0.05)
+    monkeypatch.setattr(api_server, '_hedge_launches', deque())
+    fetch_brave_results.plan = plan
+    fetch_brave_results.started = started
+    fetch_brave_results.cancelled = cancelled
+    fetch_brave_results.scraped = scraped
+    fetch_brave_results.hedges = hedges
+    fetch_brave_results.scrape_delay = 0.0
+    return fetch_brave_results
+
+def run(mode, monkeypatch, settle=0.0):
+    monkeypatch.setattr(api_server, 'SEARCH_HEDGE_MODE', mode)
+
+    async def search():
+        sources = await hedged_search(QUERIES)
+        # Let losing Brave calls finish into the cache
+        await asyncio.sleep(settle)
+        return sources
+
+    return asyncio.run(search())
+
+def test_fast_first_query_is_not_hedged(brave, monkeypatch):
+    brave.plan.update({'exact': (0.0, 2), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('delayed', monkeypatch)
+    assert [source.title for source in sources] == ['exact', 'exact']
+    assert all(source.content for source in sources)
+    assert brave.started == ['exact']
+    assert brave.scraped == ['exact']
+
+def test_slow_scrape_is_not_hedged(brave, monkeypatch):
+    brave.scrape_delay = 0.2
+    brave.plan.update({'exact': (0.0, 2), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('delayed', monkeypatch)
+    assert [source.title for source in sources] == ['exact', 'exact']
+    assert brave.started == ['exact']
+    assert brave.scraped == ['exact']
+
+def test_slow_brave_call_is_hedged_and_loser_cached(brave, monkeypatch):
+    brave.plan.update({'exact': (0.2, 2), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('delayed', monkeypatch, settle=0.3)
+    assert [source.title for source in sources] == ['seo']
+    assert brave.started == ['exact', 'seo']
+    assert brave.hedges == ['seo']
+    assert brave.cancelled == []
+    # Only the winner is scraped; the loser's results are kept, unscraped, for later
+    assert brave.scraped == ['seo']
+    assert not api_server.search_cache.get('exact')[0]
+    assert api_server.hedge_results.get('exact')[0]
+
+def test_losing_results_are_scraped_when_they_win_later(brave, monkeypatch):
+    brave.plan.update({'exact': (0.2, 2), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    run('delayed', monkeypatch, settle=0.3)
+
+    sources = asyncio.run(hedged_search(['exact']))
+    assert [source.title for source in sources] == ['exact', 'exact']
+    assert all(source.content for source in sources)
+    # No second Brave call for the loser, but its pages are scraped now
+    assert brave.started == ['exact', 'seo']
+    assert brave.scraped == ['seo', 'exact']
+
+def test_empty_results_fall_back_to_next_variant(brave, monkeypatch):
+    brave.plan.update({'exact': (0.0, 0), 'seo': (0.0, 0), 'broad': (0.0, 3)})
+    sources = run('delayed', monkeypatch)
+    assert len(sources) == 3
+    assert brave.started == QUERIES
+    # Sequential fallbacks are not hedges: they may queue for a Brave slot
+    assert brave.hedges == []
+
+def test_hedge_budget_limits_speculative_calls(brave, monkeypatch):
+    monkeypatch.setattr(api_server, 'SEARCH_HEDGE_MAX_PER_MINUTE', 0)
+    brave.plan.update({'exact': (0.15, 1), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('delayed', monkeypatch)
+    assert [source.title for source in sources] == ['exact']
+    assert brave.started == ['exact']
+
+def test_cached_variant_skips_brave(brave, monkeypatch):
+    api_server.search_cache.set('exact', [Source(title='cached', url='https://example.com/cached', content='page')])
+    brave.plan.update({'exact': (0.0, 1), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('delayed', monkeypatch)
+    assert [source.title for source in sources] == ['cached']
+    assert brave.started == []
+
+def test_off_mode_runs_serially(brave, monkeypatch):
+    brave.plan.update({'exact': (0.0, 0), 'seo': (0.1, 1), 'broad': (0.0, 1)})
+    sources = run('off', monkeypatch)
+    assert [source.title for source in sources] == ['seo']
+    assert brave.started == ['exact', 'seo']
+
+def test_parallel_mode_prefers_earlier_variant_in_same_batch(brave, monkeypatch):
+    brave.plan.update({'exact': (0.0, 1), 'seo': (0.0, 1), 'broad': (0.0, 1)})
+    sources = run('parallel', monkeypatch)
+    assert [source.title for source in sources] == ['exact']
+    assert brave.started == QUERIES
+    assert brave.scraped == ['exact']
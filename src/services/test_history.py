@@ -0,0 +1,65 @@
+"""HistoryManager windows, extractive summaries and the summary cache. Run with pytest."""
+import types
+
+import pytest
+
+from src.services.history import SUMMARY_HEADER, HistoryManager, extractive_summary, message_tokens
+
+def message(role, content):
+    return types.SimpleNamespace(role=role, content=content)
+
+def conversation(turns, words=50):
+    return [
+        message('user' if i % 2 == 0 else 'assistant', f"Turn {i} is about Vegas SEO. " + 'word ' * words)
+        for i in range(turns)
+    ]
+
+@pytest.fixture(autouse=True)
+def budgets(monkeypatch):
+    for name in ('HISTORY_TOKENS', 'HISTORY_SUMMARY_TOKENS', 'HISTORY_SUMMARY_MODE', 'CHARS_PER_TOKEN'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('HISTORY_TOKENS', '500')
+    monkeypatch.setenv('HISTORY_SUMMARY_TOKENS', '100')
+
+def test_short_history_is_sent_as_is():
+    messages = conversation(3)
+    window = HistoryManager().window('gemini', messages)
+    assert window.summary is None
+    assert window.messages == messages
+    assert window.tokens_before == window.tokens_after
+
+def test_long_history_is_trimmed_to_budget():
+    messages = conversation(30)
+    window = HistoryManager().window('gemini', messages)
+    assert window.summary.startswith(SUMMARY_HEADER)
+    assert window.messages == messages[window.summarized:]
+    assert window.messages[0].role == 'user'
+    assert window.messages[-1] is messages[-1]
+    assert window.tokens_after <= 500 < window.tokens_before
+
+def test_summary_budget_is_clamped_to_half_the_history(monkeypatch):
+    monkeypatch.setenv('HISTORY_SUMMARY_TOKENS', '5000')
+    manager = HistoryManager()
+    assert manager.summary_budget('gemini') == 250
+    window = manager.window('gemini', conversation(30))
+    assert window.tokens_after <= 500
+
+def test_extractive_summary_keeps_first_and_latest_gists():
+    messages = conversation(20)
+    summary = extractive_summary(messages, 60)
+    lines = summary[len(SUMMARY_HEADER):].split('\n')
+    assert lines[0] == 'User: Turn 0 is about Vegas SEO. ...'
+    assert lines[1] == '...'
+    assert lines[-1] == 'Assistant: Turn 19 is about Vegas SEO. ...'
+    assert sum(message_tokens(message('user', line)) for line in lines) < 100
+
+def test_summary_is_reused_across_turns():
+    manager = HistoryManager()
+    messages = conversation(30)
+    first = manager.window('gemini', messages)
+    # A short next exchange leaves the folded prefix unchanged
+    second = manager.window('gemini', messages + conversation(2, words=1))
+    assert second.summarized == first.summarized
+    assert second.summary == first.summary
+    stats = manager.stats()
+    assert (stats['summary_misses'], stats['summary_hits']) == (1, 1)
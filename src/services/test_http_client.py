@@ -0,0 +1,31 @@
+"""HttpClient session lifecycle across event loops. Run with pytest."""
+import asyncio
+
+import pytest
+
+from src.services.http_client import HttpClient
+
+def test_session_from_a_closed_loop_is_closed_and_replaced():
+    client = HttpClient()
+    first = asyncio.run(client.get_session())
+
+    async def reopen():
+        session = await client.get_session()
+        await client.close()
+        return session
+
+    second = asyncio.run(reopen())
+    assert second is not first
+    assert first.closed
+
+def test_session_in_use_on_another_live_loop_is_not_replaced():
+    client = HttpClient()
+    other = asyncio.new_event_loop()
+    try:
+        first = other.run_until_complete(client.get_session())
+        with pytest.raises(RuntimeError):
+            asyncio.run(client.get_session())
+        assert not first.closed
+        other.run_until_complete(client.close())
+    finally:
+        other.close()
@@ -0,0 +1,54 @@
+"""Cold-start budget for the API server.
+
+Every worker pays the import of src.services.api_server on deploy and on
+autoscale, so it is measured in a fresh interpreter with no API keys set.
+Run with pytest, or directly: python -m src.services.test_import_time
+IMPORT_TIME_BUDGET overrides the budget (seconds).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', '1.2'))
+RUNS = 3
+
+# Loaded on first use only; importing the server must not pull them in
+LAZY_MODULES = ('bs4', 'textblob', 'nltk', 'numpy', 'lxml')
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import src.services.api_server
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def measure_import() -> dict:
+    """Import the server in a fresh interpreter without provider keys"""
+    env = {key: value for key, value in os.environ.items() if not key.startswith('VITE_')}
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=str(REPO_ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, f"Import failed:\n{result.stderr}"
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_within_budget():
+    best = min(measure_import()['seconds'] for _ in range(RUNS))
+    assert best < IMPORT_TIME_BUDGET, f"Importing api_server took {best:.3f}s (budget {IMPORT_TIME_BUDGET}s)"
+
+def test_heavy_dependencies_load_lazily():
+    loaded = measure_import()['loaded']
+    assert not loaded, f"Imported eagerly at startup: {', '.join(loaded)}"
+
+if __name__ == "__main__":
+    samples = [measure_import() for _ in range(RUNS)]
+    print(f"Import time: best {min(s['seconds'] for s in samples):.3f}s of {RUNS} (budget {IMPORT_TIME_BUDGET}s)")
+    print(f"Heavy modules loaded at import: {samples[0]['loaded'] or 'none'}")
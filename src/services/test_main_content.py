@@ -0,0 +1,29 @@
+"""extract_main_content on both parser backends, and CONTENT_PARSER validation. Run with pytest."""
+import pytest
+
+from src.services.main_content import extract_main_content
+
+BODY = "Las Vegas businesses compete hard for local search traffic. " * 8
+PAGE = f"""<html><head><title>Vegas SEO</title><script>var x = 1;</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<div class="ad-banner">Buy now</div>
+<article><h1>Local SEO</h1><p>{BODY}</p><p>Reviews matter.</p></article>
+<footer>Copyright</footer>
+</body></html>"""
+
+def test_stdlib_backend_keeps_main_content_only():
+    content = extract_main_content(PAGE, parser='html.parser')
+    assert content.title == 'Vegas SEO'
+    assert 'Local SEO' in content.text and 'Reviews matter.' in content.text
+    for chrome in ('Home', 'Buy now', 'Copyright', 'var x'):
+        assert chrome not in content.text
+
+def test_lxml_backend_matches_stdlib():
+    pytest.importorskip('lxml')
+    assert extract_main_content(PAGE, parser='lxml') == extract_main_content(PAGE, parser='html.parser')
+
+def test_unknown_parser_is_rejected(monkeypatch):
+    monkeypatch.setenv('CONTENT_PARSER', 'lmxl')
+    with pytest.raises(RuntimeError, match='CONTENT_PARSER'):
+        extract_main_content(PAGE)
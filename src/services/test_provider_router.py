@@ -0,0 +1,161 @@
+"""ProviderRouter failover and hedging against fake providers.
+
+Providers are async generators that wait a set delay, then either raise or
+stream their chunks. Run with pytest.
+"""
+import asyncio
+import types
+
+import pytest
+from fastapi import HTTPException
+
+from src.services import api_server
+from src.services.provider_router import ProviderRouter
+
+def fake_provider(chunks=('hello', ' world'), delay=0.0, error=None, fail_after=None):
+    async def provider(messages):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        for index, chunk in enumerate(chunks):
+            if index == fail_after:
+                raise HTTPException(status_code=502, detail="stream broke")
+            yield chunk
+    return provider
+
+def collect(router, preferred='a'):
+    async def run():
+        return [chunk async for chunk in router.stream(preferred, [])]
+    return asyncio.run(run())
+
+def in_flight(router):
+    return {name: stats.in_flight for name, stats in router.stats.items()}
+
+def test_failover_to_next_provider():
+    router = ProviderRouter(
+        {'a': fake_provider(error=HTTPException(status_code=503, detail="down")), 'b': fake_provider(('from b',))},
+        mode='failover'
+    )
+    assert collect(router) == ['from b']
+    assert router.stats['a'].error_rate == 1.0
+    assert router.stats['b'].wins == 1
+    assert in_flight(router) == {'a': 0, 'b': 0}
+
+def test_on_serve_reports_failover_provider():
+    router = ProviderRouter(
+        {'a': fake_provider(error=HTTPException(status_code=503, detail="down")), 'b': fake_provider(('from b',))},
+        mode='failover'
+    )
+    served = []
+
+    async def run():
+        return [chunk async for chunk in router.stream('a', [], on_serve=served.append)]
+
+    assert asyncio.run(run()) == ['from b']
+    assert served == ['b']
+
+def test_client_error_is_not_failed_over():
+    calls = []
+    async def b(messages):
+        calls.append('b')
+        yield 'from b'
+    router = ProviderRouter({'a': fake_provider(error=HTTPException(status_code=400, detail="bad")), 'b': b}, mode='failover')
+    with pytest.raises(HTTPException) as raised:
+        collect(router)
+    assert raised.value.status_code == 400
+    assert calls == []
+    assert in_flight(router) == {'a': 0, 'b': 0}
+
+def test_hedge_wins_when_primary_is_slow():
+    router = ProviderRouter(
+        {'a': fake_provider(('slow',), delay=1.0), 'b': fake_provider(('fast',))},
+        mode='hedge',
+        ttft_threshold=0.05
+    )
+    assert collect(router) == ['fast']
+    assert router.stats['b'].wins == 1
+    assert router.stats['a'].cancelled == 1
+    assert in_flight(router) == {'a': 0, 'b': 0}
+
+def test_hedge_client_error_does_not_kill_streaming_primary():
+    router = ProviderRouter(
+        {'a': fake_provider(('primary',), delay=0.15), 'b': fake_provider(error=HTTPException(status_code=400, detail="blocked"))},
+        mode='hedge',
+        ttft_threshold=0.05
+    )
+    assert collect(router) == ['primary']
+    assert router.stats['a'].wins == 1
+    assert in_flight(router) == {'a': 0, 'b': 0}
+
+def test_client_error_in_same_batch_as_winner_keeps_winner():
+    router = ProviderRouter(
+        {'a': fake_provider(('primary',), delay=0.1), 'b': fake_provider(delay=0.1, error=HTTPException(status_code=400, detail="blocked"))},
+        mode='hedge',
+        ttft_threshold=0.0
+    )
+    assert collect(router) == ['primary']
+    assert in_flight(router) == {'a': 0, 'b': 0}
+
+def test_mid_stream_failure_counts_once():
+    router = ProviderRouter({'a': fake_provider(('one', 'two'), fail_after=1)}, mode='single')
+    with pytest.raises(HTTPException):
+        collect(router)
+    snapshot = router.stats['a'].snapshot()
+    assert snapshot['samples'] == 1
+    assert snapshot['error_rate'] == 1.0
+    assert snapshot['in_flight'] == 0
+
+def test_success_records_ttft():
+    router = ProviderRouter({'a': fake_provider()}, mode='single')
+    assert collect(router) == ['hello', ' world']
+    snapshot = router.stats['a'].snapshot()
+    assert snapshot['samples'] == 1
+    assert snapshot['error_rate'] == 0.0
+    assert snapshot['ttft_p50'] is not None
+
+def test_unhealthy_preferred_provider_goes_last():
+    router = ProviderRouter({'a': fake_provider(), 'b': fake_provider()}, mode='failover', min_samples=2)
+    for _ in range(2):
+        router.stats['a'].record_error()
+    assert router.rank('a') == ['b', 'a']
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    async def text(self):
+        return 'upstream said no'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+def upstream_provider(status, monkeypatch):
+    """Provider that opens its stream through open_llm_stream against an upstream answering `status`"""
+    async def request(send):
+        return FakeResponse(status)
+    monkeypatch.setattr(api_server, 'upstreams', types.SimpleNamespace(get=lambda name: types.SimpleNamespace(request=request)))
+
+    async def provider(messages):
+        await api_server.open_llm_stream('a', 'A', lambda: None)
+        yield 'unreachable'
+    return provider
+
+@pytest.mark.parametrize('status', [400, 401, 403])
+def test_upstream_client_errors_are_not_failed_over(status, monkeypatch):
+    router = ProviderRouter({'a': upstream_provider(status, monkeypatch), 'b': fake_provider(('from b',))}, mode='failover')
+    with pytest.raises(HTTPException) as raised:
+        collect(router)
+    assert raised.value.status_code == status
+    assert router.stats['b'].wins == 0
+
+@pytest.mark.parametrize('status,mapped', [(429, 503), (500, 502), (503, 502)])
+def test_upstream_server_errors_fail_over(status, mapped, monkeypatch):
+    router = ProviderRouter({'a': upstream_provider(status, monkeypatch), 'b': fake_provider(('from b',))}, mode='failover')
+    assert collect(router) == ['from b']
+    assert router.stats['a'].error_rate == 1.0
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(api_server.open_llm_stream('a', 'A', lambda: None))
+    assert raised.value.status_code == mapped
@@ -0,0 +1,98 @@
+"""GCRA token bucket spacing and rejection, on a fake clock. Run with pytest."""
+import asyncio
+import types
+
+import pytest
+
+from src.services import rate_limit
+from src.services.rate_limit import MemoryStore, RateLimitExceeded, SqliteStore, TokenBucketLimiter
+
+class FakeClock:
+    """Stands in for the `time` module; sleeping advances it instantly"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.slept = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    monkeypatch.setattr(rate_limit, 'asyncio', types.SimpleNamespace(sleep=clock.sleep, to_thread=asyncio.to_thread))
+    monkeypatch.setattr(rate_limit, '_store', MemoryStore())
+    return clock
+
+@pytest.mark.parametrize('make_store', [lambda tmp_path: MemoryStore(), lambda tmp_path: SqliteStore(tmp_path / 'buckets.sqlite3')])
+def test_reserve_allows_burst_then_spaces_requests(clock, tmp_path, make_store):
+    store = make_store(tmp_path)
+    # 10/s with a burst of 3
+    waits = [store.reserve('k', 0.1, 0.2, None) for _ in range(5)]
+    assert waits == pytest.approx([0.0, 0.0, 0.0, 0.1, 0.2])
+
+    clock.now += 1.0
+    assert store.reserve('k', 0.1, 0.2, None) == 0.0
+
+@pytest.mark.parametrize('make_store', [lambda tmp_path: MemoryStore(), lambda tmp_path: SqliteStore(tmp_path / 'buckets.sqlite3')])
+def test_reserve_rejects_past_max_wait_without_taking_a_slot(clock, tmp_path, make_store):
+    store = make_store(tmp_path)
+    assert store.reserve('k', 1.0, 0.0, 0.5) == 0.0
+    assert store.reserve('k', 1.0, 0.0, 0.5) is None
+    # The rejected call did not push the next slot further out
+    assert store.reserve('k', 1.0, 0.0, None) == pytest.approx(1.0)
+
+def test_keys_are_independent(clock):
+    store = MemoryStore()
+    assert store.reserve('a', 1.0, 0.0, None) == 0.0
+    assert store.reserve('b', 1.0, 0.0, None) == 0.0
+    assert store.reserve('a', 1.0, 0.0, None) == pytest.approx(1.0)
+
+def test_acquire_sleeps_until_the_reserved_slot(clock):
+    limiter = TokenBucketLimiter('test', rate=2.0, burst=1)
+
+    async def run():
+        return [await limiter.acquire('host') for _ in range(3)]
+
+    assert asyncio.run(run()) == pytest.approx([0.0, 0.5, 0.5])
+    assert clock.slept == pytest.approx([0.5, 0.5])
+    stats = limiter.stats()
+    assert stats['acquired'] == 3
+    assert stats['delayed'] == 2
+
+def test_acquire_raises_past_max_wait(clock):
+    limiter = TokenBucketLimiter('test', rate=1.0, burst=1)
+
+    async def run():
+        await limiter.acquire()
+        await limiter.acquire(max_wait=0.5)
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(run())
+    assert limiter.stats()['rejected'] == 1
+    assert clock.slept == []
+
+def test_zero_rate_disables_limiting(clock):
+    limiter = TokenBucketLimiter('test', rate=0.0)
+    assert asyncio.run(limiter.acquire()) == 0.0
+
+def test_expired_buckets_are_pruned(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limit, 'PRUNE_EVERY', 3)
+    for store in (MemoryStore(), SqliteStore(tmp_path / 'buckets.sqlite3')):
+        store.reserve('old', 1.0, 0.0, None)
+        clock.now += 10.0
+        store.reserve('a', 1.0, 0.0, None)
+        store.reserve('b', 1.0, 0.0, None)
+        if isinstance(store, MemoryStore):
+            keys = set(store._tat)
+        else:
+            keys = {key for (key,) in store._connect().execute('SELECT key FROM buckets')}
+        assert keys == {'a', 'b'}
@@ -0,0 +1,178 @@
+"""Circuit breaker, retry budget and Upstream retry policy, on a fake clock. Run with pytest."""
+import asyncio
+import types
+from email.utils import formatdate
+
+import aiohttp
+import pytest
+
+from src.services import resilience
+from src.services.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, Upstream, parse_retry_after
+
+class FakeClock:
+    """Stands in for the `time` module"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+class FakeResponse:
+    def __init__(self, status: int, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.released = False
+
+    def release(self) -> None:
+        self.released = True
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+@pytest.fixture
+def upstream(monkeypatch):
+    for key, value in {'ATTEMPTS': '3', 'BASE_DELAY': '0.5', 'MAX_DELAY': '8', 'RETRY_BUDGET': '0.2',
+                       'BREAKER_THRESHOLD': '5', 'BREAKER_TIMEOUT': '30'}.items():
+        monkeypatch.setenv(f'UPSTREAM_{key}', value)
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(resilience, 'asyncio', types.SimpleNamespace(
+        sleep=sleep, get_running_loop=asyncio.get_running_loop, TimeoutError=asyncio.TimeoutError
+    ))
+    upstream = Upstream('test')
+    upstream.backoff = lambda attempt, retry_after=None: 0.1 if retry_after is None else retry_after
+    upstream.slept = slept
+    return upstream
+
+def sender(*outcomes):
+    """send() that returns or raises each outcome in turn"""
+    calls = []
+
+    async def send():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    send.calls = calls
+    return send
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_in() == 10
+    assert breaker.opened == 1
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+def test_breaker_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.retry_in() == 10
+    assert breaker.opened == 2
+
+def test_breaker_released_probe_can_be_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+def test_retry_budget_refills_by_ratio():
+    budget = RetryBudget(ratio=0.5, max_tokens=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert budget.try_spend()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 1
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after(' 7 ') == 7.0
+    assert parse_retry_after(formatdate(clock.now + 30, usegmt=True)) == pytest.approx(30, abs=1)
+    assert parse_retry_after(formatdate(clock.now - 30, usegmt=True)) == 0.0
+    assert parse_retry_after('soon') is None
+
+def test_request_retries_server_errors(upstream):
+    first = FakeResponse(503)
+    send = sender(first, FakeResponse(200))
+    response = asyncio.run(upstream.request(send))
+    assert response.status == 200
+    assert first.released
+    assert upstream.slept == [0.1]
+    assert upstream.stats()['retries'] == 1
+    assert upstream.breaker.state == 'closed'
+
+def test_request_honors_retry_after(upstream):
+    send = sender(FakeResponse(429, {'Retry-After': '2'}), FakeResponse(200))
+    assert asyncio.run(upstream.request(send)).status == 200
+    assert upstream.slept == [2.0]
+
+def test_request_returns_client_errors_without_retrying(upstream):
+    send = sender(FakeResponse(404))
+    assert asyncio.run(upstream.request(send)).status == 404
+    assert len(send.calls) == 1
+    assert upstream.slept == []
+
+def test_request_raises_last_connection_error(upstream):
+    send = sender(*(aiohttp.ClientConnectionError('refused') for _ in range(3)))
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(upstream.request(send))
+    assert len(send.calls) == 3
+
+def test_request_stops_when_retry_budget_is_spent(upstream):
+    upstream.budget.tokens = 0
+    send = sender(FakeResponse(503), FakeResponse(200))
+    assert asyncio.run(upstream.request(send)).status == 503
+    assert upstream.stats()['budget_exhausted'] == 1
+
+def test_request_fails_fast_while_open(upstream, clock):
+    for _ in range(upstream.breaker.failure_threshold):
+        upstream.breaker.record_failure()
+    send = sender(FakeResponse(200))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.request(send))
+    assert send.calls == []
+    assert upstream.stats()['rejected'] == 1
@@ -0,0 +1,22 @@
+"""SearchIndex indexing rules and blog sync failures, on a temporary SQLite file. Run with pytest."""
+from src.services.search_index import SearchIndex
+
+def test_snippet_only_pages_are_not_indexed(tmp_path):
+    index = SearchIndex(path=str(tmp_path / 'index.sqlite3'))
+    index.add('https://example.com/a', 'A', '', 'vegas seo snippet')
+    assert index.search('vegas seo') == []
+    assert index.stats()['documents'] == {}
+
+def test_empty_content_never_replaces_indexed_text(tmp_path):
+    index = SearchIndex(path=str(tmp_path / 'index.sqlite3'))
+    index.add('https://example.com/a', 'A', 'full vegas seo page text', 'snippet')
+    index.add('https://example.com/a', 'A', '', 'newer snippet')
+    [hit] = index.search('vegas seo')
+    assert hit.content == 'full vegas seo page text'
+    assert index.stats()['documents'] == {'web': 1}
+
+def test_unreadable_ghost_db_is_skipped(tmp_path):
+    ghost = tmp_path / 'ghost.db'
+    ghost.write_bytes(b'not a database' * 100)
+    index = SearchIndex(path=str(tmp_path / 'index.sqlite3'), ghost_db=str(ghost), blog_url='https://blog.example.com/')
+    assert index.sync_blog() == 0
@@ -0,0 +1,53 @@
+"""parse_sitemap on well-formed and hostile sitemap XML, with and without defusedxml. Run with pytest."""
+import pytest
+from fastapi import HTTPException
+
+from src.services import api_server
+from src.services.api_server import parse_sitemap
+
+URLSET = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    b'<url><loc>https://example.com/a</loc></url><url><loc>https://example.com/b</loc></url>'
+    b'</urlset>'
+)
+
+BILLION_LAUGHS = (
+    b'<?xml version="1.0"?><!DOCTYPE lolz [<!ENTITY lol "lol">'
+    b'<!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;">]>'
+    b'<urlset><url><loc>&lol2;</loc></url></urlset>'
+)
+
+EXTERNAL_ENTITY = (
+    b'<?xml version="1.0"?><!DOCTYPE urlset [<!ENTITY secret SYSTEM "file:///etc/passwd">]>'
+    b'<urlset><url><loc>&secret;</loc></url></urlset>'
+)
+
+@pytest.fixture(params=['defusedxml', 'stdlib'])
+def parser(request, monkeypatch):
+    if request.param == 'defusedxml':
+        pytest.importorskip('defusedxml')
+        assert api_server.SafeElementTree is not None
+    else:
+        monkeypatch.setattr(api_server, 'SafeElementTree', None)
+    return request.param
+
+def test_urlset_is_parsed(parser):
+    root = parse_sitemap(URLSET)
+    assert root.tag.endswith('urlset')
+    assert [el.text for el in root.iter() if el.tag.endswith('loc')] == ['https://example.com/a', 'https://example.com/b']
+
+@pytest.mark.parametrize('body', [
+    BILLION_LAUGHS,
+    EXTERNAL_ENTITY,
+    URLSET.replace(b'<urlset', b'<!DOCTYPE urlset><urlset', 1),
+    URLSET.decode().encode('utf-16'),
+])
+def test_dtds_and_entities_are_rejected(parser, body):
+    with pytest.raises(HTTPException) as e:
+        parse_sitemap(body)
+    assert e.value.status_code == 400
+
+def test_malformed_xml_is_a_400(parser):
+    with pytest.raises(HTTPException, match='Invalid sitemap XML'):
+        parse_sitemap(URLSET[:-5])
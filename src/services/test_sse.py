@@ -0,0 +1,80 @@
+"""SSEDecoder framing and iter_sse_json decoding, with and without orjson. Run with pytest."""
+import asyncio
+import importlib
+import sys
+
+import pytest
+
+from src.services import sse
+from src.services.sse import SSEDecoder
+
+STREAM = b': keep-alive\n\ndata: {"a": 1}\n\nevent: delta\ndata: {"b": 2}\n\ndata: [DONE]\n\n'
+
+def decode(chunks):
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    return events + decoder.flush()
+
+def byte_chunks(data):
+    return [data[i:i + 1] for i in range(len(data))]
+
+class FakeContent:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def iter_any(self):
+        for chunk in self._chunks:
+            yield chunk
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self.content = FakeContent(chunks)
+
+def collect(chunks):
+    async def run():
+        return [event async for event in sse.iter_sse_json(FakeResponse(chunks))]
+
+    return asyncio.run(run())
+
+def test_whole_stream_in_one_chunk():
+    assert decode([STREAM]) == [b'{"a": 1}', b'{"b": 2}', b'[DONE]']
+
+@pytest.mark.parametrize('split', range(1, len(STREAM)))
+def test_events_split_at_any_boundary(split):
+    assert decode([STREAM[:split], STREAM[split:]]) == decode([STREAM])
+
+def test_events_split_into_single_bytes():
+    assert decode(byte_chunks(STREAM)) == decode([STREAM])
+
+@pytest.mark.parametrize('newline', [b'\r\n', b'\r'])
+def test_crlf_and_cr_line_endings(newline):
+    stream = STREAM.replace(b'\n', newline)
+    assert decode([stream]) == decode([STREAM])
+    # A CRLF split between chunks must not read as two line endings
+    assert decode(byte_chunks(stream)) == decode([STREAM])
+
+def test_multi_line_data_is_joined_with_newlines():
+    stream = b'data: first\ndata:second\ndata: \n\n'
+    assert decode([stream]) == [b'first\nsecond\n']
+
+def test_unterminated_event_is_dispatched_on_flush():
+    decoder = SSEDecoder()
+    assert decoder.feed(b'data: {"a": 1}') == []
+    assert decoder.flush() == [b'{"a": 1}']
+
+def test_iter_sse_json_stops_at_done_and_skips_malformed():
+    chunks = [b'data: {"a": 1}\n\ndata: {not json}\n\n', b'data: [DONE]\n\ndata: {"b": 2}\n\n']
+    assert collect(chunks) == [{'a': 1}]
+
+@pytest.fixture
+def without_orjson(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    yield importlib.reload(sse)
+    monkeypatch.undo()
+    importlib.reload(sse)
+
+def test_stdlib_fallback_without_orjson(without_orjson):
+    assert without_orjson.orjson is None
+    assert collect(byte_chunks(STREAM)) == [{'a': 1}, {'b': 2}]
@@ -0,0 +1,42 @@
+"""Trace export to TRACE_EXPORT files. Run with pytest."""
+import asyncio
+import json
+import threading
+
+from src.services import tracing
+from src.services.tracing import flush_exports, span, start_trace
+
+def test_file_export_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    target = tmp_path / 'traces.jsonl'
+    monkeypatch.setenv('TRACE_EXPORT', str(target))
+    writers = []
+    append = tracing._append
+
+    def recording_append(path, line):
+        writers.append(threading.current_thread())
+        append(path, line)
+
+    monkeypatch.setattr(tracing, '_append', recording_append)
+
+    async def request(name):
+        trace = start_trace(name)
+        with span('search'):
+            await asyncio.sleep(0)
+        return trace.finish()
+
+    async def run():
+        records = await asyncio.gather(*(request(f'chat-{i}') for i in range(5)))
+        await flush_exports()
+        return records
+
+    records = asyncio.run(run())
+    assert writers and threading.main_thread() not in writers
+    lines = [json.loads(line) for line in target.read_text().splitlines()]
+    assert sorted(line['trace_id'] for line in lines) == sorted(record['trace_id'] for record in records)
+    assert all(line['spans'][0]['name'] == 'search' for line in lines)
+
+def test_file_export_without_a_loop_is_written_inline(tmp_path, monkeypatch):
+    target = tmp_path / 'traces.jsonl'
+    monkeypatch.setenv('TRACE_EXPORT', str(target))
+    record = start_trace('cli').finish()
+    assert json.loads(target.read_text()) == record
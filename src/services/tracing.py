@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+class Span(NamedTuple):
+    name: str
+    start_ms: float
+    duration_ms: float
+    attributes: Dict[str, Any]
+
+class Trace:
+    """Timing spans for one request.
+
+    The active trace lives in a context variable, so spans recorded in tasks
+    spawned by the request (concurrent scrapes, hedged searches) land in it
+    too. Code running outside a traced request records nothing.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def add(self, name: str, started: float, duration: float, **attributes: Any) -> None:
+        """Record a span from perf_counter() start and duration in seconds"""
+        self.spans.append(Span(
+            name=name,
+            start_ms=round((started - self.started) * 1000, 2),
+            duration_ms=round(duration * 1000, 2),
+            attributes=attributes
+        ))
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def server_timing(self) -> str:
+        """Spans as a Server-Timing header value, plus the request total"""
+        entries = []
+        for span in self.spans:
+            entry = span.name
+            description = span.attributes.get('desc')
+            if description:
+                entry += f';desc="{str(description)[:80]}"'
+            entries.append(f'{entry};dur={span.duration_ms}')
+        entries.append(f'total;dur={self.elapsed_ms}')
+        return ', '.join(entries)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'total_ms': self.elapsed_ms,
+            'spans': [span._asdict() for span in sorted(self.spans, key=lambda span: span.start_ms)],
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """Summary of the trace, also exported as a structured record when TRACE_EXPORT is set"""
+        record = self.summary()
+        target = os.getenv('TRACE_EXPORT', '')
+        if target == 'stdout':
+            print(json.dumps(record))
+        elif target:
+            export_line(target, json.dumps(record) + '\n')
+        return record
+
+# File exports run in a thread so a slow disk never stalls the event loop;
+# the lock keeps concurrent records from interleaving within the file
+_export_lock = threading.Lock()
+_pending_exports: Set[asyncio.Future] = set()
+
+def _append(target: str, line: str) -> None:
+    with _export_lock, open(target, 'a') as f:
+        f.write(line)
+
+def _exported(task: asyncio.Future) -> None:
+    _pending_exports.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Trace export failed: {task.exception()}")
+
+def export_line(target: str, line: str) -> None:
+    """Append to the export file off the event loop, or inline when no loop is running"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        _append(target, line)
+        return
+    task = asyncio.ensure_future(asyncio.to_thread(_append, target, line))
+    _pending_exports.add(task)
+    task.add_done_callback(_exported)
+
+async def flush_exports() -> None:
+    """Wait for trace records still being written (call on shutdown)"""
+    if _pending_exports:
+        await asyncio.gather(*_pending_exports, return_exceptions=True)
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('trace', default=None)
+
+def start_trace(name: str) -> Trace:
+    trace = Trace(name)
+    _current_trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time the enclosed block as a span of the current trace.
+
+    Yields the attribute dict so the block can add to it (e.g. a TTFT).
+    A `desc` attribute is shown in the Server-Timing header.
+    """
+    trace = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        if trace is not None:
+            trace.add(name, started, time.perf_counter() - started, **attributes)
+
+def record_span(name: str, duration: float, **attributes: Any) -> None:
+    """Record a span measured elsewhere (e.g. in a worker process) as ending now"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - duration, duration, **attributes)
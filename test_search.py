@@ -2,6 +2,7 @@ import asyncio
 from src.services.brave_search import BraveSearchTool
 from src.services.query_analyzer import QueryAnalyzer
 from src.services.content_scraper import ContentScraper
+from src.services.http_client import http_client
 
 async def test_search_and_analysis():
     # Test cases with different types of queries
@@ -79,5 +80,11 @@ async def test_search_and_analysis():
             print(f"Error processing query: {str(e)}")
             continue
 
+async def main():
+    try:
+        await test_search_and_analysis()
+    finally:
+        await http_client.close()
+
 if __name__ == "__main__":
-    asyncio.run(test_search_and_analysis()) 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file